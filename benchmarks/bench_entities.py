@@ -0,0 +1,239 @@
+"""Micro-benchmarks of the entity evaluation done on every refresh.
+
+Times native_value of all sensor descriptions, is_on of all binary sensor
+descriptions and is_on of the switches for fleets of synthetic cars. The cars
+are built from the addressable dicts, objects and attributes of
+weconnect_cupra, shaped like its domains. The entities read the snapshots
+taken when the fleet is created, taking the snapshots is timed on its own.
+
+The scenarios cover complete cars, cars missing most domains and cars without
+any domain, where every description misses its value.
+
+Needs Home Assistant, pytest-benchmark and the library from manifest.json.
+Run from the repository root. Compare against the stored baseline, failing
+on a regression of the fastest round by more than 25 %, with
+
+    pytest benchmarks/bench_entities.py --benchmark-storage=benchmarks/.benchmarks \
+        --benchmark-warmup=on --benchmark-compare=0001 \
+        --benchmark-compare-fail=min:25%
+
+and store a new baseline with --benchmark-autosave instead. The baselines are
+kept per machine type in benchmarks/.benchmarks. On shared machines the
+fastest round of a benchmark varies by up to a factor of two between runs,
+run the comparison again before chasing a regression of a few benchmarks.
+"""
+
+from __future__ import annotations
+
+from enum import Enum
+from pathlib import Path
+import sys
+from types import SimpleNamespace
+
+import pytest
+from weconnect_cupra.addressable import (
+    AddressableAttribute,
+    AddressableDict,
+    AddressableObject,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from custom_components.cupra_we_connect import (  # noqa: E402
+    binary_sensor,
+    sensor,
+    switch,
+)
+from custom_components.cupra_we_connect.accessors import (  # noqa: E402
+    VehicleSnapshot,
+)
+from custom_components.cupra_we_connect.const import DOMAIN  # noqa: E402
+
+ENTRY_ID = "benchmark"
+FLEET_SIZES = (1, 10, 100)
+# Steps whose value is a dict of elements in the library
+CONTAINERS = {"doors", "windows"}
+# Domains left in the cars of the "partial" scenario
+PARTIAL_DOMAINS = {"charging"}
+
+
+def leaf_value(index: int, path: tuple[str, ...], on_value):
+    """Return the value of a leaf, varying with the car."""
+    if on_value is not None:
+        # Half of the cars report the on value
+        if index % 2 or not isinstance(on_value, Enum):
+            return on_value
+        return next(member for member in type(on_value) if member != on_value)
+    if path[-1] == "climatisationState":
+        return "off" if index % 2 else "heating"
+    if path[-1] == "chargingState":
+        return "charging" if index % 2 else "readyForCharging"
+    if path[-1] == "maxChargeCurrentAC":
+        return "maximum" if index % 2 else "reduced"
+    return float(index % 100)
+
+
+def child(node, step: str, in_container: bool, make):
+    """Return the child of a node, adding it if missing."""
+    if in_container:
+        if step not in node:
+            node[step] = make(step, node)
+        return node[step]
+    if not hasattr(node, step):
+        setattr(node, step, make(step, node))
+    return getattr(node, step)
+
+
+def add_path(domains: AddressableDict, path: tuple[str, ...], value) -> None:
+    """Add the nodes of a path to the domains of a synthetic car."""
+    node = child(domains, path[0], True, AddressableDict)
+    node = child(node, path[1], True, AddressableObject)
+    in_container = False
+    for step in path[2:-1]:
+        node = child(
+            node,
+            step,
+            in_container,
+            AddressableDict if step in CONTAINERS else AddressableObject,
+        )
+        in_container = step in CONTAINERS
+    child(
+        node,
+        path[-1],
+        in_container,
+        lambda step, parent: AddressableAttribute(step, parent, value, type(value)),
+    )
+
+
+def synthetic_vehicle(index: int, domains: set[str] | None = None):
+    """Return a car with every path read by the platforms.
+
+    Only the given domains are kept, all of them if None.
+    """
+    vehicle = SimpleNamespace(
+        vin=f"VSSZZZK1ZB{index:07d}",
+        nickname=f"Born {index}",
+        model="Born",
+        domains=AddressableDict(localAddress="domains", parent=None),
+    )
+    descriptions = [(sensor.path, None) for sensor in sensor.SENSORS]
+    descriptions += [(sensor.path, sensor.on_value) for sensor in binary_sensor.SENSORS]
+    for path, on_value in descriptions:
+        if domains is None or path[0] in domains:
+            add_path(vehicle.domains, path, leaf_value(index, path, on_value))
+    return vehicle
+
+
+SCENARIOS = {
+    "complete": None,
+    "partial": PARTIAL_DOMAINS,
+    "empty": set(),
+}
+
+
+class Fleet:
+    """Cars with their coordinators and entities, as after the setup."""
+
+    def __init__(self, size: int, domains: set[str] | None) -> None:
+        """Create the cars and the entities of all descriptions."""
+        self.vehicles = [synthetic_vehicle(index, domains) for index in range(size)]
+        self.hass = SimpleNamespace(
+            data={DOMAIN: {ENTRY_ID + "_tracker": SimpleNamespace(pending=no_pending)}}
+        )
+        self.coordinators = [
+            SimpleNamespace(
+                data=VehicleSnapshot.from_vehicle(vehicle),
+                config_entry=SimpleNamespace(entry_id=ENTRY_ID),
+            )
+            for vehicle in self.vehicles
+        ]
+        self.sensors = []
+        self.binary_sensors = []
+        self.switches = []
+        for vehicle, coordinator in zip(self.vehicles, self.coordinators):
+            vin = vehicle.vin
+            self.sensors += [
+                sensor.VolkswagenIDSensor(description, None, coordinator, vin)
+                for description in sensor.SENSORS
+            ]
+            self.binary_sensors += [
+                binary_sensor.VolkswagenIDSensor(description, None, coordinator, vin)
+                for description in binary_sensor.SENSORS
+            ]
+            for switch_class in (
+                switch.CupraClimateSwitch,
+                switch.CupraChargingSwitch,
+                switch.CupraACChargeSpeedSwitch,
+            ):
+                entity = switch_class(None, coordinator, vin)
+                entity.hass = self.hass
+                self.switches.append(entity)
+
+    def refresh(self) -> None:
+        """Hand fresh snapshots to every coordinator, like a refresh does."""
+        for vehicle, coordinator in zip(self.vehicles, self.coordinators):
+            coordinator.data = VehicleSnapshot.from_vehicle(vehicle)
+
+
+def no_pending(vin: str, command: str) -> None:
+    """Return that no command waits for confirmation."""
+    return None
+
+
+def evaluate(fleet: Fleet, entities: list, attribute: str) -> list:
+    """Read the state of the entities."""
+    return [getattr(entity, attribute) for entity in entities]
+
+
+@pytest.fixture(params=FLEET_SIZES, ids=lambda size: f"{size}cars")
+def size(request) -> int:
+    """Return the number of cars."""
+    return request.param
+
+
+@pytest.fixture(params=list(SCENARIOS))
+def fleet(request, size: int) -> Fleet:
+    """Return a fleet of the size and scenario."""
+    return Fleet(size, SCENARIOS[request.param])
+
+
+def test_sensor_native_value(benchmark, fleet: Fleet) -> None:
+    """Time native_value of all sensor descriptions."""
+    benchmark.group = "sensor"
+    values = benchmark(evaluate, fleet, fleet.sensors, "native_value")
+    assert len(values) == len(fleet.sensors)
+
+
+def test_binary_sensor_is_on(benchmark, fleet: Fleet) -> None:
+    """Time is_on of all binary sensor descriptions."""
+    benchmark.group = "binary_sensor"
+    values = benchmark(evaluate, fleet, fleet.binary_sensors, "is_on")
+    assert len(values) == len(fleet.binary_sensors)
+
+
+def test_switch_is_on(benchmark, fleet: Fleet) -> None:
+    """Time is_on of the switches."""
+    benchmark.group = "switch"
+    values = benchmark(evaluate, fleet, fleet.switches, "is_on")
+    assert all(isinstance(value, bool) for value in values)
+
+
+def test_snapshot(benchmark, fleet: Fleet) -> None:
+    """Time taking the snapshots of all cars."""
+    benchmark.group = "snapshot"
+    benchmark(fleet.refresh)
+    assert all(
+        coordinator.data.vin == vehicle.vin
+        for vehicle, coordinator in zip(fleet.vehicles, fleet.coordinators)
+    )
+
+
+def test_synthetic_vehicle_resolves() -> None:
+    """Check that the complete cars resolve every description."""
+    fleet = Fleet(2, None)
+    assert None not in evaluate(fleet, fleet.sensors, "native_value")
+    assert True in evaluate(fleet, fleet.binary_sensors, "is_on")
+    assert False in evaluate(fleet, fleet.binary_sensors, "is_on")
+    empty = Fleet(1, set())
+    assert set(evaluate(empty, empty.sensors, "native_value")) == {None}
@@ -0,0 +1,257 @@
+"""End-to-end benchmark of the integration against the local mock cloud.
+
+For every fleet size the integration is set up in a test Home Assistant
+instance whose requests go to mock_cloud.py, running in a process of its own.
+Measured are the entry setup (login from persisted tokens, full update, entity
+creation), the refresh of all car coordinators, the CPU time of both, the
+state writes per refresh, the requests sent and the memory held by the entry.
+
+Needs Home Assistant, pytest-homeassistant-custom-component and the library
+from manifest.json installed. The request limits of the integration are lifted
+through the options of the entry while measuring, they would only measure the
+configured pacing. Keep the default limits with --default-limits to see how
+the pacing holds up the refreshes.
+
+    python benchmarks/bench_integration.py --vehicles 1 10 100 500 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+import json
+import multiprocessing
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import aiohttp
+
+from mock_cloud import CLOUD_HOST, USER_ID, MockCloudAdapter, serve
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+from weconnect_cupra import weconnect_cupra  # noqa: E402
+from weconnect_cupra.service import Service  # noqa: E402
+
+from custom_components.cupra_we_connect import refresh  # noqa: E402
+from custom_components.cupra_we_connect.client import (  # noqa: E402
+    async_stash_validated_session,
+    session_store,
+)
+from custom_components.cupra_we_connect.const import (  # noqa: E402
+    CONF_DAILY_REQUEST_BUDGET,
+    CONF_REQUESTS_PER_MINUTE,
+    DOMAIN,
+)
+from homeassistant import loader  # noqa: E402
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+
+ENTRY_DATA = {
+    "username": "bench@example.com",
+    "password": "bench",
+    "service": "MyCupra",
+}
+
+
+@asynccontextmanager
+async def mock_cloud(**options):
+    """Run the mock cloud in a subprocess, yield its URL."""
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=serve, args=(sender, options), daemon=True)
+    process.start()
+    try:
+        yield await asyncio.get_running_loop().run_in_executor(None, receiver.recv)
+    finally:
+        process.terminate()
+        process.join()
+
+
+async def cloud_stats(url: str) -> dict:
+    """Return the requests the mock cloud served so far."""
+    async with aiohttp.ClientSession() as session, session.get(
+        f"{url}/_stats"
+    ) as response:
+        return await response.json()
+
+
+def requests_served(before: dict, after: dict) -> int:
+    """Return the number of requests served between two stats."""
+    return sum(after["requests"].values()) - sum(before["requests"].values())
+
+
+@asynccontextmanager
+async def integration(url: str, options: dict):
+    """Yield a test Home Assistant instance and a config entry for the mock cloud."""
+
+    refresh.BASE_URL = f"{url}/{CLOUD_HOST}"
+
+    async with async_test_home_assistant() as hass:
+        hass.config.config_dir = tempfile.mkdtemp(prefix="cupra_bench_")
+        # Pick up the integration of this repository
+        hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+        entry = MockConfigEntry(domain=DOMAIN, data=ENTRY_DATA, options=options)
+        entry.add_to_hass(hass)
+        # Start from persisted tokens, like a restart
+        await session_store(hass, entry.entry_id).async_save(
+            {
+                "token": {
+                    "access_token": "access",
+                    "refresh_token": "refresh",
+                    "token_type": "bearer",
+                    "expires_at": time.time() + 86400,
+                },
+                "user_id": USER_ID,
+            }
+        )
+        we_connect = weconnect_cupra.WeConnect(
+            username=ENTRY_DATA["username"],
+            password=ENTRY_DATA["password"],
+            service=Service(ENTRY_DATA["service"]),
+            updateAfterLogin=False,
+            loginOnInit=False,
+        )
+        we_connect.session.mount("https://", MockCloudAdapter(url))
+        async_stash_validated_session(hass, entry.data, we_connect)
+
+        yield hass, entry
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def async_measure(vehicles: int, args: argparse.Namespace) -> dict:
+    """Measure one fleet size."""
+    result: dict = {"vehicles": vehicles}
+    cloud_options = {
+        "vehicles": vehicles,
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "change_rate": args.change_rate,
+    }
+    entry_options = {}
+    if not args.default_limits:
+        entry_options[CONF_REQUESTS_PER_MINUTE] = 10**6
+        entry_options[CONF_DAILY_REQUEST_BUDGET] = 10**9
+    if args.max_concurrent_requests:
+        entry_options["max_concurrent_requests"] = args.max_concurrent_requests
+
+    async with mock_cloud(**cloud_options) as url:
+        async with integration(url, entry_options) as (hass, entry):
+            writes = 0
+
+            def count_write(event) -> None:
+                nonlocal writes
+                writes += 1
+
+            hass.bus.async_listen(EVENT_STATE_CHANGED, count_write)
+
+            stats = await cloud_stats(url)
+            cpu, wall = time.process_time(), time.perf_counter()
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+            result["setup_s"] = time.perf_counter() - wall
+            result["setup_cpu_s"] = time.process_time() - cpu
+            result["setup_requests"] = requests_served(stats, await cloud_stats(url))
+            result["entities"] = len(hass.states.async_all())
+
+            coordinators = hass.data[DOMAIN][entry.entry_id + "_vehicle_coordinators"]
+
+            async def async_timed_refresh(coordinator) -> float:
+                start = time.perf_counter()
+                await coordinator.async_refresh()
+                return time.perf_counter() - start
+
+            latencies: list[float] = []
+            rounds: list[float] = []
+            cpu_total = 0.0
+            writes = 0
+            stats = await cloud_stats(url)
+            for _ in range(args.rounds):
+                cpu, wall = time.process_time(), time.perf_counter()
+                latencies += await asyncio.gather(
+                    *(async_timed_refresh(c) for c in coordinators.values())
+                )
+                await hass.async_block_till_done()
+                rounds.append(time.perf_counter() - wall)
+                cpu_total += time.process_time() - cpu
+
+            result["refresh_round_s"] = statistics.median(rounds)
+            result["refresh_car_p50_s"] = statistics.median(latencies)
+            result["refresh_car_max_s"] = max(latencies)
+            result["refresh_cpu_ms_per_car"] = 1000 * cpu_total / len(latencies)
+            result["state_writes_per_round"] = writes / args.rounds
+            result["requests_per_round"] = (
+                requests_served(stats, await cloud_stats(url)) / args.rounds
+            )
+
+        if args.memory:
+            # Separate pass, tracing slows everything down
+            async with integration(url, entry_options) as (hass, entry):
+                tracemalloc.start()
+                before = tracemalloc.take_snapshot()
+                await hass.config_entries.async_setup(entry.entry_id)
+                await hass.async_block_till_done()
+                after = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                held = sum(
+                    stat.size_diff for stat in after.compare_to(before, "filename")
+                )
+                result["memory_mb"] = held / 2**20
+
+    return result
+
+
+def print_table(results: list[dict]) -> None:
+    """Print the results as a table."""
+    columns = list(dict.fromkeys(key for result in results for key in result))
+    print(" | ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print(
+            " | ".join(
+                (
+                    f"{result.get(column, float('nan')):>14.4g}"
+                    if isinstance(result.get(column), float)
+                    else f"{result.get(column, ''):>14}"
+                )
+                for column in columns
+            )
+        )
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    results = [await async_measure(vehicles, args) for vehicles in args.vehicles]
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per request"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--change-rate", type=float, default=0.1)
+    parser.add_argument("--max-concurrent-requests", type=int, default=None)
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument(
+        "--default-limits",
+        action="store_true",
+        help="keep the request rate and daily budget of the integration",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    asyncio.run(async_main(parser.parse_args()))
@@ -0,0 +1,353 @@
+"""Local stand-in for the Cupra cloud, serving a synthetic fleet.
+
+The server answers the token refresh of the identity service and the garage,
+capability and per-domain endpoints read by weconnect_cupra and by the
+integration. Requests are expected below a path prefix naming the original
+host, e.g. ``/ola.prod.code.seat.cloud.vwgroup.com/vehicles/<vin>/connection``,
+see MockCloudAdapter and the harness in bench_integration.py.
+
+The web login of the identity service (HTML forms) is not emulated, the
+harness starts from persisted tokens like a restart of Home Assistant does.
+
+Run it standalone with ``python benchmarks/mock_cloud.py --vehicles 10``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+from aiohttp import web
+import requests
+from requests.adapters import HTTPAdapter
+
+CLOUD_HOST = "ola.prod.code.seat.cloud.vwgroup.com"
+IDENTITY_HOST = "identity.vwgroup.io"
+USER_ID = "00000000-0000-0000-0000-00000000b3c4"
+
+
+def vin_of(index: int) -> str:
+    """Return the VIN of the car with the index in the fleet."""
+    return f"VSSZZZK1ZB{index:07d}"
+
+
+class MockCloud:
+    """aiohttp application emulating the Cupra cloud for a fleet of cars."""
+
+    def __init__(
+        self,
+        vehicles: int = 1,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        change_rate: float = 0.1,
+        seed: int = 0,
+    ) -> None:
+        """Initialize the fleet, every car starts in a known state."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.change_rate = change_rate
+        self._random = random.Random(seed)
+        self.soc = {vin_of(index): 40 + index % 50 for index in range(vehicles)}
+        self.requests: Counter[str] = Counter()
+        self.bytes_sent = 0
+        self.app = web.Application()
+        self.app.add_routes(
+            [
+                web.post(f"/{IDENTITY_HOST}/oidc/v1/token", self._token),
+                web.get(
+                    f"/{CLOUD_HOST}/v2/users/{{user_id}}/garage/vehicles", self._garage
+                ),
+                web.get(
+                    f"/{CLOUD_HOST}/v1/user/{{user_id}}/vehicle/{{vin}}/capabilities",
+                    self._capabilities,
+                ),
+                web.get(
+                    f"/{CLOUD_HOST}/vehicles/{{vin}}/charging/settings",
+                    self._charging_settings,
+                ),
+                web.get(
+                    f"/{CLOUD_HOST}/vehicles/{{vin}}/charging/status",
+                    self._charging_status,
+                ),
+                web.get(
+                    f"/{CLOUD_HOST}/v1/vehicles/{{vin}}/climatisation/status",
+                    self._climatisation_status,
+                ),
+                web.get(
+                    f"/{CLOUD_HOST}/v2/vehicles/{{vin}}/climatisation/settings",
+                    self._climatisation_settings,
+                ),
+                web.get(
+                    f"/{CLOUD_HOST}/v1/vehicles/{{vin}}/parkingposition",
+                    self._parking_position,
+                ),
+                web.get(f"/{CLOUD_HOST}/v1/vehicles/{{vin}}/mileage", self._mileage),
+                web.get(f"/{CLOUD_HOST}/v2/vehicles/{{vin}}/status", self._status),
+                web.get(f"/{CLOUD_HOST}/vehicles/{{vin}}/connection", self._connection),
+                web.get("/_stats", self._stats),
+            ]
+        )
+        self._runner: web.AppRunner | None = None
+        self.url: str | None = None
+
+    async def async_start(self, port: int = 0) -> str:
+        """Start serving on localhost, return the base URL."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        # pylint: disable-next=protected-access
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _respond(self, request: web.Request, name: str, body) -> web.Response:
+        """Answer after the configured latency, failing at the error rate."""
+        self.requests[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return web.Response(status=500, text="Mock cloud error")
+        if "vin" in request.match_info and request.match_info["vin"] not in self.soc:
+            return web.Response(status=404, text="Unknown vehicle")
+        text = json.dumps(body)
+        self.bytes_sent += len(text)
+        return web.Response(text=text, content_type="application/json")
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        """Return the requests served so far, not counted themselves."""
+        return web.json_response(
+            {"requests": dict(self.requests), "bytes": self.bytes_sent}
+        )
+
+    async def _token(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request,
+            "token",
+            {
+                "access_token": f"access-{time.monotonic()}",
+                "refresh_token": "refresh",
+                "id_token": "id",
+                "token_type": "bearer",
+                "expires_in": 3600,
+            },
+        )
+
+    async def _garage(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request,
+            "garage",
+            {
+                "vehicles": [
+                    {
+                        "vin": vin,
+                        "vehicleNickname": f"Born {index}",
+                        "model": "Born",
+                    }
+                    for index, vin in enumerate(self.soc)
+                ]
+            },
+        )
+
+    async def _capabilities(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request,
+            "capabilities",
+            {
+                "capabilities": [
+                    {"id": capability, "status": [], "userDisablingAllowed": False}
+                    for capability in (
+                        "charging",
+                        "climatisation",
+                        "parkingPosition",
+                        "state",
+                    )
+                ]
+            },
+        )
+
+    async def _charging_settings(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request,
+            "charging_settings",
+            {
+                "settings": {
+                    "maxChargeCurrentAC": "maximum",
+                    "autoUnlockPlugWhenCharged": "off",
+                    "targetSoc_pct": 80,
+                }
+            },
+        )
+
+    async def _charging_status(self, request: web.Request) -> web.Response:
+        vin = request.match_info["vin"]
+        if vin in self.soc and self._random.random() < self.change_rate:
+            self.soc[vin] = self.soc[vin] % 100 + 1
+        soc = self.soc.get(vin, 0)
+        return await self._respond(
+            request,
+            "charging_status",
+            {
+                "status": {
+                    "charging": {
+                        "chargingState": "charging" if soc < 80 else "readyForCharging",
+                        "chargeMode": "manual",
+                        "chargePower_kW": 11.0 if soc < 80 else 0.0,
+                        "chargeRate_kmph": 60 if soc < 80 else 0,
+                        "chargeType": "ac",
+                        "remainingChargingTimeToComplete_min": max(80 - soc, 0) * 6,
+                    },
+                    "battery": {
+                        "currentSOC_pct": soc,
+                        "cruisingRangeElectric_km": soc * 4,
+                    },
+                    "plug": {
+                        "plugConnectionState": "connected",
+                        "plugLockState": "locked",
+                        "externalPower": "ready",
+                        "ledColor": "green",
+                    },
+                }
+            },
+        )
+
+    async def _climatisation_status(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request,
+            "climatisation_status",
+            {
+                "climatisationStatus": {
+                    "climatisationState": "off",
+                    "remainingClimatisationTimeInMinutes": 0,
+                },
+                "windowHeatingStatus": {
+                    "windowHeatingStatus": [
+                        {"windowLocation": "front", "windowHeatingState": "off"},
+                        {"windowLocation": "rear", "windowHeatingState": "off"},
+                    ]
+                },
+            },
+        )
+
+    async def _climatisation_settings(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request,
+            "climatisation_settings",
+            {
+                "targetTemperatureInCelsius": 21.0,
+                "targetTemperatureInFahrenheit": 70.0,
+                "unitInCar": "celsius",
+                "climatisationWithoutExternalPower": True,
+                "climatisationAtUnlock": False,
+                "windowHeatingEnabled": False,
+                "zoneFrontLeftEnabled": True,
+                "zoneFrontRightEnabled": True,
+            },
+        )
+
+    async def _parking_position(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request, "parking_position", {"lat": 52.52, "lon": 13.405}
+        )
+
+    async def _mileage(self, request: web.Request) -> web.Response:
+        return await self._respond(request, "mileage", {"mileageKm": 12345})
+
+    async def _status(self, request: web.Request) -> web.Response:
+        closed = {"open": "false", "locked": "true"}
+        return await self._respond(
+            request,
+            "status",
+            {
+                "doors": {
+                    name: closed
+                    for name in ("frontLeft", "frontRight", "rearLeft", "rearRight")
+                },
+                "trunk": closed,
+                "hood": {"open": "false"},
+                "windows": {
+                    name: "closed"
+                    for name in ("frontLeft", "frontRight", "rearLeft", "rearRight")
+                },
+            },
+        )
+
+    async def _connection(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request, "connection", {"connection": {"mode": "online"}}
+        )
+
+
+class MockCloudAdapter(HTTPAdapter):
+    """Send the https requests of a requests session to the mock cloud instead."""
+
+    def __init__(self, base_url: str, **kwargs) -> None:
+        """Initialize the adapter."""
+        super().__init__(**kwargs)
+        self._base_url = base_url
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        """Rewrite https://<host>/<path> to <mock>/<host>/<path>."""
+        url = urlsplit(request.url)
+        request.url = f"{self._base_url}/{url.netloc}{url.path}" + (
+            f"?{url.query}" if url.query else ""
+        )
+        return super().send(request, **kwargs)
+
+
+async def _async_serve(port: int, started, **options) -> None:
+    """Serve the mock cloud until cancelled, report the URL once listening."""
+    cloud = MockCloud(**options)
+    started(await cloud.async_start(port))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await cloud.async_stop()
+
+
+def serve(connection, options: dict) -> None:
+    """Run the mock cloud in a process of its own, sending its URL back.
+
+    Keeps the CPU time of the server out of the measurements of the harness.
+    """
+    asyncio.run(_async_serve(0, connection.send, **options))
+
+
+def _print_url(url: str) -> None:
+    print(f"Serving the mock cloud at {url}/{CLOUD_HOST}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=1)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per request"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--change-rate", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(
+            _async_serve(
+                args.port,
+                _print_url,
+                vehicles=args.vehicles,
+                latency=args.latency,
+                error_rate=args.error_rate,
+                change_rate=args.change_rate,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
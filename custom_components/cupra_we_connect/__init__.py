@@ -1,30 +1,82 @@
 """The Volkswagen We Connect ID integration."""
 from __future__ import annotations
 
-from datetime import timedelta
+from collections.abc import Callable, Iterable
 import logging
 import asyncio
-import time
+import os
+from typing import Any
+
+import voluptuous as vol
 
 from weconnect_cupra import weconnect_cupra
 from weconnect_cupra.service import Service
 from weconnect_cupra.elements.control_operation import ControlOperation
+from weconnect_cupra.errors import (
+    AuthentificationError,
+    TemporaryAuthentificationError,
+)
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant, ServiceCall, callback
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.exceptions import (
+    ConfigEntryAuthFailed,
+    ConfigEntryNotReady,
+    HomeAssistantError,
+)
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity import DeviceInfo, Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
 )
-
-from .const import DOMAIN
+from homeassistant.loader import async_get_integration
+
+from .accessors import Path, VehicleSnapshot
+from .client import (
+    AsyncCupraClient,
+    async_pop_validated_session,
+    async_register_account_entry,
+    async_release_account_entry,
+    session_store,
+)
+from .commands import CommandQueue
+from .const import (
+    CONF_DAILY_REQUEST_BUDGET,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_REQUESTS_PER_MINUTE,
+    DAILY_REQUEST_BUDGET,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DOMAIN,
+    FIRST_REFRESH_SPREAD,
+    REQUEST_TIMEOUT,
+    REQUESTS_PER_MINUTE,
+    TRACE_EXPORT_FILE,
+)
+from .coordinator import AccountCoordinator
+from .metrics import AccountMetrics
+from .ratelimit import RateLimiter, budget_store
+from .refresh import DomainRefresher
+from .schedule import account_update_slots, stable_offset
+from .snapshot import load_vehicles, snapshot_store
+from .storage import async_remove_store
+from .tracing import EXPORT_JSONL, EXPORT_OTLP, append_lines, export_lines
 
 PLATFORMS = [Platform.BINARY_SENSOR, Platform.BUTTON, Platform.SENSOR, Platform.NUMBER, Platform.DEVICE_TRACKER, Platform.SWITCH]
 
 _LOGGER = logging.getLogger(__name__)
 
+EXPORT_TRACES_SCHEMA = vol.Schema(
+    {
+        vol.Optional("filename", default=TRACE_EXPORT_FILE): cv.string,
+        vol.Optional("format", default=EXPORT_JSONL): vol.In(
+            [EXPORT_JSONL, EXPORT_OTLP]
+        ),
+    }
+)
+
 # We shouldn't need to do this check. weconnect_cupra-python abstracts it away
 # SUPPORTED_VEHICLES = ["ID.3", "ID.4", "ID.5"]
 
@@ -33,63 +85,120 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Volkswagen We Connect ID from a config entry."""
 
     hass.data.setdefault(DOMAIN, {})
-    _we_connect = weconnect_cupra.WeConnect(
+    if (polling := async_register_account_entry(hass, entry)) != entry.entry_id:
+        # Same account configured twice, one session and poll loop serve both
+        # and the cars already have their entities
+        _LOGGER.info(
+            "Account %s is already set up, sharing the connection of entry %s",
+            entry.data["username"],
+            polling,
+        )
+        return True
+
+    # Reuse the client the config flow just logged in with
+    _we_connect = async_pop_validated_session(
+        hass, entry.data
+    ) or weconnect_cupra.WeConnect(
         username=entry.data["username"],
         password=entry.data["password"],
         service=Service(entry.data["service"]),
         updateAfterLogin=False,
         loginOnInit=False,
-        timeout=10
+        timeout=REQUEST_TIMEOUT
     )
     
-    await hass.async_add_executor_job(_we_connect.login)
-    await hass.async_add_executor_job(_we_connect.update)
-
-    async def async_update_data():
-        """Fetch data from Cupra API."""
-
-        try:
-            await asyncio.wait_for(
-                hass.async_add_executor_job(_we_connect.update),
-                timeout=120.0
-            )
-        except asyncio.TimeoutError:
-            _LOGGER.error("Timeout updating weconnect_cupra")
-            return hass.data[DOMAIN][entry.entry_id + "_vehicles"]
-        except Exception:
-            _LOGGER.error("Unknown error while updating weconnect_cupra", exc_info=1)
-            return hass.data[DOMAIN][entry.entry_id + "_vehicles"]
-
-        vehicles = []
-
-        for vin, vehicle in _we_connect.vehicles.items():
-            # TODO this needs to be done in validate_input so we can warn
-            # user if their vehicle is unsupported
-            # if vehicle.model.value in SUPPORTED_VEHICLES:
-            #     vehicles.append(vehicle)
-            vehicles.append(vehicle)
-
-        hass.data[DOMAIN][entry.entry_id + "_vehicles"] = vehicles
-        return vehicles
-
-    coordinator = DataUpdateCoordinator(
+    limiter = RateLimiter(
+        hass,
+        budget_store(hass, entry.entry_id),
+        entry.options.get(CONF_REQUESTS_PER_MINUTE, REQUESTS_PER_MINUTE),
+        entry.options.get(CONF_DAILY_REQUEST_BUDGET, DAILY_REQUEST_BUDGET),
+    )
+    await limiter.async_load()
+    metrics = AccountMetrics()
+    client = AsyncCupraClient(
         hass,
-        _LOGGER,
-        name=DOMAIN,
-        update_method=async_update_data,
-        update_interval=timedelta(minutes=5),
+        _we_connect,
+        session_store(hass, entry.entry_id),
+        limiter=limiter,
+        metrics=metrics,
     )
+    entry.async_on_unload(client.shutdown)
+    refresher = DomainRefresher(
+        hass,
+        _we_connect,
+        client,
+        entry.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        ),
+        account_update_slots(hass),
+    )
+    coordinator = AccountCoordinator(hass, entry, _we_connect, client, refresher)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id + "_coordinator"] = coordinator
+    hass.data[DOMAIN][entry.entry_id + "_vehicle_coordinators"] = (
+        coordinator.vehicle_coordinators
+    )
     hass.data[DOMAIN][entry.entry_id] = _we_connect
-    hass.data[DOMAIN][entry.entry_id + "_vehicles"] = []
-
-    # Fetch initial data so we have data when entities subscribe
-    await coordinator.async_config_entry_first_refresh()
+    hass.data[DOMAIN][entry.entry_id + "_refresher"] = refresher
+    hass.data[DOMAIN][entry.entry_id + "_metrics"] = metrics
+    hass.data[DOMAIN][entry.entry_id + "_options"] = dict(entry.options)
+    hass.data[DOMAIN][entry.entry_id + "_tracker"] = coordinator.tracker
+    hass.data[DOMAIN][entry.entry_id + "_commands"] = coordinator.commands
+
+    # The platforms name the values the snapshots keep when imported
+    integration = await async_get_integration(hass, DOMAIN)
+    for platform in PLATFORMS:
+        await integration.async_get_platform(platform)
+
+    if restored := await coordinator.snapshot.async_load():
+        # Start from the last known data, the live update runs in the background
+        coordinator.async_set_restored_data(load_vehicles(restored))
+    else:
+        # Fetch initial data so we have data when entities subscribe
+        try:
+            await client.async_login()
+        except TemporaryAuthentificationError as err:
+            raise ConfigEntryNotReady(err) from err
+        except AuthentificationError as err:
+            raise ConfigEntryAuthFailed(err) from err
+        await coordinator.async_config_entry_first_refresh()
+
+    for vin, data in coordinator.data.items():
+        coordinator.async_add_vehicle(vin, data)
+
+    # Added before the platforms, which add the entities of the new cars
+    entry.async_on_unload(
+        coordinator.async_add_listener(coordinator.async_add_new_vehicles)
+    )
 
     # Setup components
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    async def async_first_live_refresh() -> None:
+        """Replace the restored snapshot with live data."""
+        # Accounts and installations restarting together don't log in at once
+        await asyncio.sleep(
+            stable_offset(entry.entry_id, FIRST_REFRESH_SPREAD).total_seconds()
+        )
+        try:
+            await client.async_login()
+        except TemporaryAuthentificationError:
+            _LOGGER.warning("Login failed, keeping the last known vehicle data")
+        except AuthentificationError:
+            _LOGGER.error("Login rejected, please update the credentials")
+            entry.async_start_reauth(hass)
+            return
+        except Exception:  # pylint: disable=broad-except
+            # The library logs in again on the next scheduled update
+            _LOGGER.error("Login failed, keeping the last known vehicle data", exc_info=1)
+        await coordinator.async_refresh()
+
+    if restored:
+        entry.async_create_background_task(
+            hass, async_first_live_refresh(), f"{DOMAIN} first live refresh"
+        )
 
     @callback
     async def volkswagen_id_start_stop_charging(call: ServiceCall) -> None:
@@ -97,14 +206,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         vin = call.data["vin"]
         start_stop = call.data["start_stop"]
 
-        if (
-            await hass.async_add_executor_job(
-                start_stop_charging,
-                vin,
-                _we_connect,
-                start_stop,
-            )
-            is False
+        if not await async_send_command(
+            hass, entry.entry_id, vin, "charging", start_stop_charging, start_stop
         ):
             _LOGGER.error("Cannot send charging request to car")
 
@@ -117,15 +220,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if "target_temp" in call.data:
             target_temperature = call.data["target_temp"]
 
-        if (
-            await hass.async_add_executor_job(
-                set_climatisation,
-                vin,
-                _we_connect,
-                start_stop,
-                target_temperature,
-            )
-            is False
+        if not await async_send_command(
+            hass,
+            entry.entry_id,
+            vin,
+            "climatisation",
+            set_climatisation,
+            start_stop,
+            target_temperature,
         ):
             _LOGGER.error("Cannot send climate request to car")
 
@@ -137,14 +239,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if "target_soc" in call.data:
             target_soc = call.data["target_soc"]
 
-        if (
-            await hass.async_add_executor_job(
-                set_target_soc,
-                vin,
-                _we_connect,
-                target_soc,
-            )
-            is False
+        if not await async_send_command(
+            hass, entry.entry_id, vin, "target_soc", set_target_soc, target_soc
         ):
             _LOGGER.error("Cannot send target soc request to car")
 
@@ -153,14 +249,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
         vin = call.data["vin"]
         if "maximum_reduced" in call.data:
-            if (
-                await hass.async_add_executor_job(
-                    set_ac_charging_speed,
-                    vin,
-                    _we_connect,
-                    call.data["maximum_reduced"],
-                )
-                is False
+            if not await async_send_command(
+                hass,
+                entry.entry_id,
+                vin,
+                "ac_charge_speed",
+                set_ac_charging_speed,
+                call.data["maximum_reduced"],
             ):
                 _LOGGER.error("Cannot send ac speed request to car")
 
@@ -179,40 +274,145 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         DOMAIN, "volkswagen_id_set_ac_charge_speed", volkswagen_id_set_ac_charge_speed
     )
 
+    async def export_traces(call: ServiceCall) -> None:
+        await async_export_traces(hass, call.data["filename"], call.data["format"])
+
+    hass.services.async_register(
+        DOMAIN, "export_traces", export_traces, schema=EXPORT_TRACES_SCHEMA
+    )
+
     return True
 
 
+async def async_export_traces(
+    hass: HomeAssistant, filename: str, export_format: str
+) -> None:
+    """Append the traces kept by all accounts to a file in the config directory."""
+
+    if os.path.basename(filename) != filename:
+        raise HomeAssistantError(f"{filename} is not a file name without directory")
+    traces = [
+        trace
+        for key, metrics in hass.data[DOMAIN].items()
+        if isinstance(key, str) and key.endswith("_metrics")
+        for trace in metrics.tracer.traces
+    ]
+    path = hass.config.path(filename)
+    lines = export_lines(traces, export_format)
+    await hass.async_add_executor_job(append_lines, path, lines)
+    _LOGGER.info("Exported %s traces to %s", len(traces), path)
+
+
+@callback
+def async_add_supported_entities(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+    candidates: Callable[
+        [str, DataUpdateCoordinator], Iterable[tuple[Path | None, Callable[[], Entity]]]
+    ],
+) -> None:
+    """Add the entities of every car whose value it reports.
+
+    The candidates of a car are the path of the value an entity needs, None
+    if it needs none, and the factory of the entity. Candidates the car
+    doesn't support yet are checked again on every update of the car, and
+    added once it reports their value. Cars a later full update finds get
+    their entities the same way.
+    """
+    coordinators: dict[str, DataUpdateCoordinator] = hass.data[DOMAIN][
+        entry.entry_id + "_vehicle_coordinators"
+    ]
+    added: set[str] = set()
+
+    @callback
+    def _async_add_vehicle(vin: str, coordinator: DataUpdateCoordinator) -> None:
+        added.add(vin)
+        pending = list(candidates(vin, coordinator))
+
+        @callback
+        def _async_add_supported() -> None:
+            if not pending or coordinator.data is None:
+                return
+            values = coordinator.data.values
+            supported = [
+                create for path, create in pending if path is None or path in values
+            ]
+            if not supported:
+                return
+            pending[:] = [
+                (path, create)
+                for path, create in pending
+                if path is not None and path not in values
+            ]
+            _LOGGER.debug("Adding %s entities supported by %s", len(supported), vin)
+            async_add_entities([create() for create in supported])
+
+        _async_add_supported()
+        entry.async_on_unload(coordinator.async_add_listener(_async_add_supported))
+
+    @callback
+    def _async_add_new_vehicles() -> None:
+        for vin, coordinator in list(coordinators.items()):
+            if vin not in added:
+                _async_add_vehicle(vin, coordinator)
+
+    _async_add_new_vehicles()
+    entry.async_on_unload(
+        hass.data[DOMAIN][entry.entry_id + "_coordinator"].async_add_listener(
+            _async_add_new_vehicles
+        )
+    )
+
+
+async def async_command_sent(hass: HomeAssistant, entry_id: str, vin: str) -> None:
+    """Poll a car at burst cadence for a while after a command was sent to it."""
+
+    coordinator: AccountCoordinator = hass.data[DOMAIN][entry_id + "_coordinator"]
+    await coordinator.async_command_sent(vin)
+
+
+async def async_send_command(
+    hass: HomeAssistant, entry_id: str, vin: str, command: str, job, *args
+) -> bool:
+    """Queue a command for a car, see CommandQueue and CommandTracker."""
+
+    commands: CommandQueue = hass.data[DOMAIN][entry_id + "_commands"]
+    return await commands.async_send(vin, command, job, *args)
+
+
 def start_stop_charging(
     call_data_vin, api: weconnect_cupra.WeConnect, operation: str
 ) -> bool:
     """Start of stop charging of your volkswagen."""
 
-    for vin, vehicle in api.vehicles.items():
-        if vin == call_data_vin:
-
-            if operation == "start":
-                try:
-                    if (
-                        vehicle.controls.chargingControl is not None
-                        and vehicle.controls.chargingControl.enabled
-                    ):
-                        vehicle.controls.chargingControl.value = ControlOperation.START
-                        _LOGGER.info("Sended start charging call to the car")
-                except Exception as exc:
-                    _LOGGER.error("Failed to send request to car - %s", exc)
-                    return False
-
-            if operation == "stop":
-                try:
-                    if (
-                        vehicle.controls.chargingControl is not None
-                        and vehicle.controls.chargingControl.enabled
-                    ):
-                        vehicle.controls.chargingControl.value = ControlOperation.STOP
-                        _LOGGER.info("Sended stop charging call to the car")
-                except Exception as exc:
-                    _LOGGER.error("Failed to send request to car - %s", exc)
-                    return False
+    if (vehicle := api.vehicles.get(call_data_vin)) is None:
+        _LOGGER.error("Unknown VIN %s", call_data_vin)
+        return False
+
+    if operation == "start":
+        try:
+            if (
+                vehicle.controls.chargingControl is not None
+                and vehicle.controls.chargingControl.enabled
+            ):
+                vehicle.controls.chargingControl.value = ControlOperation.START
+                _LOGGER.info("Sended start charging call to the car")
+        except Exception as exc:
+            _LOGGER.error("Failed to send request to car - %s", exc)
+            return False
+
+    if operation == "stop":
+        try:
+            if (
+                vehicle.controls.chargingControl is not None
+                and vehicle.controls.chargingControl.enabled
+            ):
+                vehicle.controls.chargingControl.value = ControlOperation.STOP
+                _LOGGER.info("Sended stop charging call to the car")
+        except Exception as exc:
+            _LOGGER.error("Failed to send request to car - %s", exc)
+            return False
     return True
 
 
@@ -221,22 +421,24 @@ def set_ac_charging_speed(
 ) -> bool:
     """Set charging speed in your volkswagen."""
 
-    for vin, vehicle in api.vehicles.items():
-        if vin == call_data_vin:
-            if (
-                charging_speed
-                != vehicle.domains["charging"][
-                    "chargingSettings"
-                ].maxChargeCurrentAC.value
-            ):
-                try:
-                    vehicle.domains["charging"][
-                        "chargingSettings"
-                    ].maxChargeCurrentAC.value = charging_speed
-                    _LOGGER.info("Sended charging speed call to the car")
-                except Exception as exc:
-                    _LOGGER.error("Failed to send request to car - %s", exc)
-                    return False
+    if (vehicle := api.vehicles.get(call_data_vin)) is None:
+        _LOGGER.error("Unknown VIN %s", call_data_vin)
+        return False
+
+    if (
+        charging_speed
+        != vehicle.domains["charging"][
+            "chargingSettings"
+        ].maxChargeCurrentAC.value
+    ):
+        try:
+            vehicle.domains["charging"][
+                "chargingSettings"
+            ].maxChargeCurrentAC.value = charging_speed
+            _LOGGER.info("Sended charging speed call to the car")
+        except Exception as exc:
+            _LOGGER.error("Failed to send request to car - %s", exc)
+            return False
 
     return True
 
@@ -246,21 +448,23 @@ def set_target_soc(call_data_vin, api: weconnect_cupra.WeConnect, target_soc: in
 
     target_soc = int(target_soc)
 
-    for vin, vehicle in api.vehicles.items():
-        if vin == call_data_vin:
-            if (
-                target_soc > 10
-                and target_soc
-                != vehicle.domains["charging"]["chargingSettings"].targetSOC_pct.value
-            ):
-                try:
-                    vehicle.domains["charging"][
-                        "chargingSettings"
-                    ].targetSOC_pct.value = target_soc
-                    _LOGGER.info("Sended target SoC call to the car")
-                except Exception as exc:
-                    _LOGGER.error("Failed to send request to car - %s", exc)
-                    return False
+    if (vehicle := api.vehicles.get(call_data_vin)) is None:
+        _LOGGER.error("Unknown VIN %s", call_data_vin)
+        return False
+
+    if (
+        target_soc > 10
+        and target_soc
+        != vehicle.domains["charging"]["chargingSettings"].targetSOC_pct.value
+    ):
+        try:
+            vehicle.domains["charging"][
+                "chargingSettings"
+            ].targetSOC_pct.value = target_soc
+            _LOGGER.info("Sended target SoC call to the car")
+        except Exception as exc:
+            _LOGGER.error("Failed to send request to car - %s", exc)
+            return False
     return True
 
 
@@ -269,86 +473,152 @@ def set_climatisation(
 ) -> bool:
     """Set climate in your volkswagen."""
 
-    for vin, vehicle in api.vehicles.items():
-        if vin == call_data_vin:
+    if (vehicle := api.vehicles.get(call_data_vin)) is None:
+        _LOGGER.error("Unknown VIN %s", call_data_vin)
+        return False
+
+    if (
+        target_temperature > 10
+        and target_temperature
+        != vehicle.domains["climatisation"][
+            "climatisationSettings"
+        ].targetTemperature_C.value
+    ):
+        try:
+            vehicle.domains["climatisation"][
+                "climatisationSettings"
+            ].targetTemperature_C.value = float(target_temperature)
+            _LOGGER.info("Sended target temperature call to the car")
+        except Exception as exc:
+            _LOGGER.error("Failed to send request to car - %s", exc)
+            return False
+
+    if operation == "start":
+        try:
+            if (
+                vehicle.controls.climatizationControl is not None
+                and vehicle.controls.climatizationControl.enabled
+            ):
+                vehicle.controls.climatizationControl.value = ControlOperation.START
+                _LOGGER.info("Sended start climate call to the car")
+        except Exception as exc:
+            _LOGGER.error("Failed to send request to car - %s", exc)
+            return False
 
+    if operation == "stop":
+        try:
             if (
-                target_temperature > 10
-                and target_temperature
-                != vehicle.domains["climatisation"][
-                    "climatisationSettings"
-                ].targetTemperature_C.value
+                vehicle.controls.climatizationControl is not None
+                and vehicle.controls.climatizationControl.enabled
             ):
-                try:
-                    vehicle.domains["climatisation"][
-                        "climatisationSettings"
-                    ].targetTemperature_C.value = float(target_temperature)
-                    _LOGGER.info("Sended target temperature call to the car")
-                except Exception as exc:
-                    _LOGGER.error("Failed to send request to car - %s", exc)
-                    return False
-
-            if operation == "start":
-                try:
-                    if (
-                        vehicle.controls.climatizationControl is not None
-                        and vehicle.controls.climatizationControl.enabled
-                    ):
-                        vehicle.controls.climatizationControl.value = ControlOperation.START
-                        _LOGGER.info("Sended start climate call to the car")
-                except Exception as exc:
-                    _LOGGER.error("Failed to send request to car - %s", exc)
-                    return False
-
-            if operation == "stop":
-                try:
-                    if (
-                        vehicle.controls.climatizationControl is not None
-                        and vehicle.controls.climatizationControl.enabled
-                    ):
-                        vehicle.controls.climatizationControl.value = ControlOperation.STOP
-                        _LOGGER.info("Sended stop climate call to the car")
-                except Exception as exc:
-                    _LOGGER.error("Failed to send request to car - %s", exc)
-                    return False
+                vehicle.controls.climatizationControl.value = ControlOperation.STOP
+                _LOGGER.info("Sended stop climate call to the car")
+        except Exception as exc:
+            _LOGGER.error("Failed to send request to car - %s", exc)
+            return False
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
 
+    if entry.entry_id not in hass.data[DOMAIN]:
+        # Shared the connection of another entry of the account
+        async_hand_over_account(hass, entry)
+        return True
+
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
+        if entry.disabled_by is not None:
+            # A reload keeps polling for the account, async_remove_entry
+            # hands it over when the entry is deleted
+            async_hand_over_account(hass, entry)
         hass.data[DOMAIN].pop(entry.entry_id)
+        hass.data[DOMAIN].pop(entry.entry_id + "_refresher", None)
+        hass.data[DOMAIN].pop(entry.entry_id + "_commands", None)
+        hass.data[DOMAIN].pop(entry.entry_id + "_tracker", None)
+        hass.data[DOMAIN].pop(entry.entry_id + "_vehicle_coordinators", None)
+        hass.data[DOMAIN].pop(entry.entry_id + "_metrics", None)
+        hass.data[DOMAIN].pop(entry.entry_id + "_options", None)
 
     return unload_ok
 
 
-def get_object_value(value) -> str:
-    """Get value from object or enum."""
+@callback
+def async_hand_over_account(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Let another entry of the account log in and poll once this one is gone."""
+    if (entry_id := async_release_account_entry(hass, entry)) is not None:
+        hass.async_create_task(hass.config_entries.async_reload(entry_id))
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry after its options changed.
+
+    The reauth flow reloads the entry itself after it changed the data.
+    """
+    if entry.options != hass.data[DOMAIN].get(entry.entry_id + "_options"):
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted session, snapshot and budget of a deleted config entry."""
+
+    # Entries that failed to set up keep the account until they are removed
+    async_hand_over_account(hass, entry)
+    # Through the instances the entry used, their pending saves would write
+    # the data back
+    await async_remove_store(hass, session_store(hass, entry.entry_id))
+    await async_remove_store(hass, snapshot_store(hass, entry.entry_id))
+    await async_remove_store(hass, budget_store(hass, entry.entry_id))
+
 
-    while hasattr(value, "value"):
-        value = value.value
+class ChangeAwareEntity(CoordinatorEntity):
+    """Coordinator entity that only writes its state if it changed."""
 
-    return value
+    _written_state: tuple | None = None
+
+    def _state_fingerprint(self) -> tuple:
+        """Return everything of the entity that ends up in the state machine."""
+        return (
+            self.available,
+            self.state,
+            self.state_attributes,
+            self.extra_state_attributes,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the state written when the entity is added."""
+        await super().async_added_to_hass()
+        self._written_state = self._state_fingerprint()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Skip the state write if the refresh didn't change the entity."""
+        state = self._state_fingerprint()
+        if state == self._written_state:
+            return
+        self._written_state = state
+        super()._handle_coordinator_update()
 
 
-class VolkswagenIDBaseEntity(CoordinatorEntity):
+class VolkswagenIDBaseEntity(ChangeAwareEntity):
     """Common base for VolkswagenID entities."""
 
     # _attr_should_poll = False
     _attr_attribution = "Data provided by Cupra Connect ID"
+    # Vehicle domain the entity reads, only enabled entities get it refreshed
+    vehicle_domain: str | None = None
 
     def __init__(
         self,
         we_connect: weconnect_cupra.WeConnect,
         coordinator: DataUpdateCoordinator,
-        index: int,
+        vin: str,
     ) -> None:
         """Initialize sensor."""
         super().__init__(coordinator)
         self.we_connect = we_connect
-        self.index = index
+        self.vin = vin
 
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, f"vw{self.data.vin}")},
@@ -357,7 +627,31 @@ class VolkswagenIDBaseEntity(CoordinatorEntity):
             name=f"{self.data.nickname}",
         )
 
+    async def async_added_to_hass(self) -> None:
+        """Request the vehicle domain of the entity to be refreshed."""
+        await super().async_added_to_hass()
+        if self.vehicle_domain is None:
+            return
+
+        refresher: DomainRefresher = self.hass.data[DOMAIN][
+            self.coordinator.config_entry.entry_id + "_refresher"
+        ]
+        refresher.wanted[self.vehicle_domain] += 1
+
+        @callback
+        def _release_vehicle_domain() -> None:
+            refresher.wanted[self.vehicle_domain] -= 1
+
+        self.async_on_remove(_release_vehicle_domain)
+
     @property
-    def data(self):
+    def data(self) -> VehicleSnapshot:
         """Shortcut to access coordinator data for the entity."""
-        return self.coordinator.data[self.index]
+        return self.coordinator.data
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Flag values restored from the snapshot until the first live update."""
+        if self.data.restored:
+            return {"stale": True}
+        return None
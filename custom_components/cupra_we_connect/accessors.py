@@ -0,0 +1,152 @@
+"""Snapshots of the vehicle values, taken once per coordinator refresh."""
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any
+
+from weconnect_cupra.addressable import (
+    AddressableAttribute,
+    AddressableDict,
+    AddressableObject,
+)
+
+Path = tuple[str, ...]
+
+# Paths are the same for all cars and refreshes, the snapshots share them
+_PATHS: dict[Path, Path] = {}
+# Paths of the values the snapshots keep, and the paths walked to reach them
+SNAPSHOT_PATHS: set[Path] = set()
+_WALKED: set[Path] = set()
+_ADDRESSABLE = (AddressableAttribute, AddressableObject)
+
+
+def keep_paths(paths: Iterable[Path]) -> None:
+    """Have the snapshots keep the values at the paths.
+
+    The modules reading the snapshots call this when they are imported, all
+    other values reported by the cars are left out.
+    """
+    for path in paths:
+        SNAPSHOT_PATHS.add(_PATHS.setdefault(path, path))
+        _WALKED.update(path[:length] for length in range(1, len(path) + 1))
+
+
+def get_object_value(value) -> str:
+    """Get value from object or enum."""
+
+    while hasattr(value, "value"):
+        value = value.value
+
+    return value
+
+
+def walk_domains(
+    element, path: Path = (), values: dict[Path, Any] | None = None
+) -> dict[Path, Any]:
+    """Collect the unwrapped values of the reported library attributes by path.
+
+    Steps into dicts (domains, statuses, doors, windows) are the keys, all
+    other steps are the python attribute names. Only the paths passed to
+    keep_paths are collected, other branches aren't walked.
+    """
+    if values is None:
+        values = {}
+    if isinstance(element, AddressableAttribute):
+        if path in SNAPSHOT_PATHS and (
+            value := get_object_value(element.value)
+        ) is not None:
+            values[_PATHS[path]] = value
+    elif isinstance(element, AddressableDict):
+        for key, item in element.items():
+            if (child_path := (*path, str(key))) in _WALKED:
+                walk_domains(item, child_path, values)
+    elif isinstance(element, AddressableObject):
+        for name, child in vars(element).items():
+            if (
+                isinstance(child, _ADDRESSABLE)
+                and child.parent is element
+                and not name.startswith("_")
+                and (child_path := (*path, name)) in _WALKED
+            ):
+                walk_domains(child, child_path, values)
+    return values
+
+
+class VehicleSnapshot:
+    """Immutable values of a vehicle, the entities don't see the library objects.
+
+    The values are keyed by their path through the vehicle domains, e.g.
+    ("charging", "chargingStatus", "chargingState"). Attributes the car
+    didn't report, and paths nobody passed to keep_paths, are missing.
+    """
+
+    __slots__ = ("vin", "nickname", "model", "values", "updated", "restored")
+
+    vin: str
+    nickname: str
+    model: str
+    values: Mapping[Path, Any]
+    updated: Mapping[str, datetime]
+    restored: bool
+
+    def __init__(
+        self,
+        vin: str,
+        nickname: str,
+        model: str,
+        values: dict[Path, Any],
+        updated: dict[str, datetime] | None = None,
+        restored: bool = False,
+    ) -> None:
+        """Initialize the snapshot, taking over the values."""
+        setattr_ = object.__setattr__
+        setattr_(self, "vin", vin)
+        setattr_(self, "nickname", nickname)
+        setattr_(self, "model", model)
+        setattr_(self, "values", MappingProxyType(values))
+        # Domain -> time it was last refreshed
+        setattr_(self, "updated", MappingProxyType(dict(updated or {})))
+        # Last known values persisted before a restart, not live yet
+        setattr_(self, "restored", restored)
+
+    @classmethod
+    def from_vehicle(
+        cls, vehicle, updated: dict[str, datetime] | None = None
+    ) -> VehicleSnapshot:
+        """Take a snapshot of a library vehicle."""
+        return cls(
+            str(vehicle.vin),
+            str(vehicle.nickname),
+            str(vehicle.model),
+            walk_domains(vehicle.domains),
+            updated,
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Refuse changes, a new refresh takes a new snapshot."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        """Refuse changes, a new refresh takes a new snapshot."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        """Return true if both snapshots hold the same data."""
+        if not isinstance(other, VehicleSnapshot):
+            return NotImplemented
+        return (
+            self.vin == other.vin
+            and self.nickname == other.nickname
+            and self.model == other.model
+            and self.restored == other.restored
+            and self.updated == other.updated
+            and self.values == other.values
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def get(self, path: Path) -> Any:
+        """Return the value at a path through the vehicle domains, None if missing."""
+        return self.values.get(path)
@@ -1,8 +1,8 @@
 """Binary_sensor integration."""
 from __future__ import annotations
 
-from collections.abc import Callable
 from dataclasses import dataclass
+from functools import partial
 
 from weconnect_cupra import weconnect_cupra
 from weconnect_cupra.elements.plug_status import PlugStatus
@@ -18,7 +18,8 @@ from homeassistant.components.binary_sensor import (
 )
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from . import VolkswagenIDBaseEntity, get_object_value
+from . import VolkswagenIDBaseEntity, async_add_supported_entities
+from .accessors import VehicleSnapshot, get_object_value, keep_paths
 from .const import DOMAIN
 
 
@@ -26,81 +27,90 @@ from .const import DOMAIN
 class VolkswagenIdBinaryEntityDescription(BinarySensorEntityDescription):
     """Describes Volkswagen ID binary sensor entity."""
 
-    value: Callable = lambda x, y: x
+    # Path through the vehicle domains, the first step is the domain
+    path: tuple[str, ...] = ()
     on_value: object | None = None
 
+    def resolve(self, data: VehicleSnapshot) -> bool | None:
+        """Resolve the state of the sensor from a vehicle snapshot."""
+        if (state := data.get(self.path)) is None:
+            return None
+        if isinstance(state, bool):
+            return state
+        return state == get_object_value(self.on_value)
+
 
 SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
     VolkswagenIdBinaryEntityDescription(
         key="climatisationWithoutExternalPower",
         name="Climatisation Without External Power",
-        value=lambda data: data["climatisation"][
-            "climatisationSettings"
-        ].climatisationWithoutExternalPower.value,
+        path=(
+            "climatisation",
+            "climatisationSettings",
+            "climatisationWithoutExternalPower",
+        ),
     ),
     VolkswagenIdBinaryEntityDescription(
         key="climatisationAtUnlock",
         name="Climatisation At Unlock",
-        value=lambda data: data["climatisation"][
-            "climatisationSettings"
-        ].climatisationAtUnlock.value,
+        path=("climatisation", "climatisationSettings", "climatisationAtUnlock"),
     ),
     VolkswagenIdBinaryEntityDescription(
         key="zoneFrontLeftEnabled",
         name="Zone Front Left Enabled",
-        value=lambda data: data["climatisation"][
-            "climatisationSettings"
-        ].zoneFrontLeftEnabled.value,
+        path=("climatisation", "climatisationSettings", "zoneFrontLeftEnabled"),
     ),
     VolkswagenIdBinaryEntityDescription(
         key="zoneFrontRightEnabled",
         name="Zone Front Right Enabled",
-        value=lambda data: data["climatisation"][
-            "climatisationSettings"
-        ].zoneFrontRightEnabled.value,
+        path=("climatisation", "climatisationSettings", "zoneFrontRightEnabled"),
     ),
     VolkswagenIdBinaryEntityDescription(
         key="windowHeatingEnabled",
         name="Window Heating Enabled",
-        value=lambda data: data["climatisation"][
-            "climatisationSettings"
-        ].windowHeatingEnabled.value,
+        path=("climatisation", "climatisationSettings", "windowHeatingEnabled"),
     ),
     VolkswagenIdBinaryEntityDescription(
         key="frontWindowHeatingState",
         name="Front Window Heating State",
-        value=lambda data: data["climatisation"]["windowHeatingStatus"]
-        .windows["front"]
-        .windowHeatingState.value,
+        path=(
+            "climatisation",
+            "windowHeatingStatus",
+            "windows",
+            "front",
+            "windowHeatingState",
+        ),
         on_value=WindowHeatingStatus.Window.WindowHeatingState.ON,
     ),
     VolkswagenIdBinaryEntityDescription(
         key="rearWindowHeatingState",
         name="Rear Window Heating State",
-        value=lambda data: data["climatisation"]["windowHeatingStatus"]
-        .windows["rear"]
-        .windowHeatingState.value,
+        path=(
+            "climatisation",
+            "windowHeatingStatus",
+            "windows",
+            "rear",
+            "windowHeatingState",
+        ),
         on_value=WindowHeatingStatus.Window.WindowHeatingState.ON,
     ),
     VolkswagenIdBinaryEntityDescription(
         key="autoUnlockPlugWhenCharged",
         name="Auto Unlock Plug When Charged",
-        value=lambda data: data["charging"][
-            "chargingSettings"
-        ].autoUnlockPlugWhenCharged.value,
+        path=("charging", "chargingSettings", "autoUnlockPlugWhenCharged"),
         on_value="on",  # ChargingSettings.UnlockPlugState.ON,
     ),
     VolkswagenIdBinaryEntityDescription(
         key="plugConnectionState",
         name="Plug Connection State",
-        value=lambda data: data["charging"]["plugStatus"].plugConnectionState.value,
+        path=("charging", "plugStatus", "plugConnectionState"),
         device_class=BinarySensorDeviceClass.PLUG,
         on_value=PlugStatus.PlugConnectionState.CONNECTED,
     ),
     VolkswagenIdBinaryEntityDescription(
         key="plugLockState",
         name="Plug Lock State",
-        value=lambda data: data["charging"]["plugStatus"].plugLockState.value,
+        path=("charging", "plugStatus", "plugLockState"),
         device_class=BinarySensorDeviceClass.LOCK,
         on_value=PlugStatus.PlugLockState.UNLOCKED,
     ),
@@ -108,14 +118,17 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
     # VolkswagenIdBinaryEntityDescription(
     #     key="insufficientBatteryLevelWarning",
     #     name="Insufficient Battery Level Warning",
-    #     value=lambda data: data["readiness"][
-    #         "readinessStatus"
-    #     ].connectionWarning.insufficientBatteryLevelWarning.value,
+    #     path=(
+    #         "readiness",
+    #         "readinessStatus",
+    #         "connectionWarning",
+    #         "insufficientBatteryLevelWarning",
+    #     ),
     # ),
     VolkswagenIdBinaryEntityDescription(
         name="Car Is Online",
         key="isOnline",
-        value=lambda data: data["status"]["connectionStatus"].connectionState.value,
+        path=("status", "connectionStatus", "connectionState"),
         device_class=BinarySensorDeviceClass.CONNECTIVITY,
         on_value=ConnectionState.ConnectionState.ONLINE
     ),
@@ -123,16 +136,14 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
     # VolkswagenIdBinaryEntityDescription(
     #     name="Car Is Active",
     #     key="isActive",
-    #     value=lambda data: data["readiness"][
-    #         "readinessStatus"
-    #     ].connectionState.isActive.value,
+    #     path=("readiness", "readinessStatus", "connectionState", "isActive"),
     # ),
     VolkswagenIdBinaryEntityDescription(
         key="doorLockStatus",
         name="Door Lock Status",
         icon="mdi:car-door-lock",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"].doorLockStatus.value,
+        path=("access", "accessStatus", "doorLockStatus"),
         on_value=AccessControlState.LockState.UNLOCKED,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -140,9 +151,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Trunk Lock Status",
         icon="mdi:lock-outline",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["trunk"]
-        .lockState.value,
+        path=("access", "accessStatus", "doors", "trunk", "lockState"),
         on_value=AccessControlState.LockState.UNLOCKED,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -150,7 +159,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Hood Lock Status",
         icon="mdi:lock-outline",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"].doors["hood"].lockState.value,
+        path=("access", "accessStatus", "doors", "hood", "lockState"),
         on_value=AccessControlState.LockState.UNLOCKED,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -158,9 +167,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Rear Right Lock Status",
         icon="mdi:car-door-lock",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["rearRight"]
-        .lockState.value,
+        path=("access", "accessStatus", "doors", "rearRight", "lockState"),
         on_value=AccessControlState.LockState.UNLOCKED,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -168,9 +175,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Rear Left Lock Status",
         icon="mdi:car-door-lock",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["rearLeft"]
-        .lockState.value,
+        path=("access", "accessStatus", "doors", "rearLeft", "lockState"),
         on_value=AccessControlState.LockState.UNLOCKED,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -178,9 +183,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Front Left Lock Status",
         icon="mdi:car-door-lock",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["frontLeft"]
-        .lockState.value,
+        path=("access", "accessStatus", "doors", "frontLeft", "lockState"),
         on_value=AccessControlState.LockState.UNLOCKED,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -188,25 +191,21 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Front Right Lock Status",
         icon="mdi:car-door-lock",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["frontRight"]
-        .lockState.value,
+        path=("access", "accessStatus", "doors", "frontRight", "lockState"),
         on_value=AccessControlState.LockState.UNLOCKED,
     ),
     VolkswagenIdBinaryEntityDescription(
         key="trunkOpenStatus",
         name="Trunk Open Status",
         device_class=BinarySensorDeviceClass.DOOR,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["trunk"]
-        .openState.value,
+        path=("access", "accessStatus", "doors", "trunk", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
         key="hoodOpenStatus",
         name="Hood Open Status",
         device_class=BinarySensorDeviceClass.DOOR,
-        value=lambda data: data["access"]["accessStatus"].doors["hood"].openState.value,
+        path=("access", "accessStatus", "doors", "hood", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -214,9 +213,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Rear Right Open Status",
         icon="mdi:car-door",
         device_class=BinarySensorDeviceClass.DOOR,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["rearRight"]
-        .openState.value,
+        path=("access", "accessStatus", "doors", "rearRight", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -224,9 +221,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Rear Left Open Status",
         icon="mdi:car-door",
         device_class=BinarySensorDeviceClass.DOOR,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["rearLeft"]
-        .openState.value,
+        path=("access", "accessStatus", "doors", "rearLeft", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -234,9 +229,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Front Left Open Status",
         icon="mdi:car-door",
         device_class=BinarySensorDeviceClass.DOOR,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["frontLeft"]
-        .openState.value,
+        path=("access", "accessStatus", "doors", "frontLeft", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -244,9 +237,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Door Front Right Open Status",
         icon="mdi:car-door",
         device_class=BinarySensorDeviceClass.DOOR,
-        value=lambda data: data["access"]["accessStatus"]
-        .doors["frontRight"]
-        .openState.value,
+        path=("access", "accessStatus", "doors", "frontRight", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -254,9 +245,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Window Rear Right Open Status",
         icon="mdi:window-closed",
         device_class=BinarySensorDeviceClass.WINDOW,
-        value=lambda data: data["access"]["accessStatus"]
-        .windows["rearRight"]
-        .openState.value,
+        path=("access", "accessStatus", "windows", "rearRight", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -264,9 +253,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Window Rear Left Open Status",
         icon="mdi:window-closed",
         device_class=BinarySensorDeviceClass.WINDOW,
-        value=lambda data: data["access"]["accessStatus"]
-        .windows["rearLeft"]
-        .openState.value,
+        path=("access", "accessStatus", "windows", "rearLeft", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -274,9 +261,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Window Front Left Open Status",
         icon="mdi:window-closed",
         device_class=BinarySensorDeviceClass.WINDOW,
-        value=lambda data: data["access"]["accessStatus"]
-        .windows["frontLeft"]
-        .openState.value,
+        path=("access", "accessStatus", "windows", "frontLeft", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -284,9 +269,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Window Front Right Open Status",
         icon="mdi:window-closed",
         device_class=BinarySensorDeviceClass.WINDOW,
-        value=lambda data: data["access"]["accessStatus"]
-        .windows["frontRight"]
-        .openState.value,
+        path=("access", "accessStatus", "windows", "frontRight", "openState"),
         on_value=AccessControlState.OpenState.OPEN,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -294,7 +277,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Overall Status",
         icon="mdi:car-info",
         device_class=BinarySensorDeviceClass.LOCK,
-        value=lambda data: data["access"]["accessStatus"].overallStatus.value,
+        path=("access", "accessStatus", "overallStatus"),
         on_value=AccessControlState.OverallState.UNSAFE,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -302,7 +285,7 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Engine Status",
         icon="mdi:engine-outline",
         device_class=BinarySensorDeviceClass.POWER,
-        value=lambda data: data["access"]["accessStatus"].engineStatus.value,
+        path=("access", "accessStatus", "engineStatus"),
         on_value=AccessControlState.EngineState.ON,
     ),
     VolkswagenIdBinaryEntityDescription(
@@ -310,27 +293,25 @@ SENSORS: tuple[VolkswagenIdBinaryEntityDescription, ...] = (
         name="Lights Status",
         icon="mdi:car-light-dimmed",
         device_class=BinarySensorDeviceClass.LIGHT,
-        value=lambda data: data["access"]["accessStatus"].lightsStatus.value,
+        path=("access", "accessStatus", "lightsStatus"),
         on_value=AccessControlState.LightsState.ON,
     ),
 )
+keep_paths(sensor.path for sensor in SENSORS)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add sensors for passed config_entry in HA."""
     we_connect: weconnect_cupra.WeConnect = hass.data[DOMAIN][config_entry.entry_id]
-    coordinator = hass.data[DOMAIN][config_entry.entry_id + "_coordinator"]
-
-    # Fetch initial data so we have data when entities subscribe
-    await coordinator.async_config_entry_first_refresh()
-
-    entities: list[VolkswagenIDSensor] = []
 
-    for index, vehicle in enumerate(coordinator.data):
+    def candidates(vin: str, coordinator: DataUpdateCoordinator):
+        """Return the binary sensors of a car with the value each of them needs."""
         for sensor in SENSORS:
-            entities.append(VolkswagenIDSensor(sensor, we_connect, coordinator, index))
-    if entities:
-        async_add_entities(entities)
+            yield sensor.path, partial(
+                VolkswagenIDSensor, sensor, we_connect, coordinator, vin
+            )
+
+    async_add_supported_entities(hass, config_entry, async_add_entities, candidates)
 
 
 class VolkswagenIDSensor(VolkswagenIDBaseEntity, BinarySensorEntity):
@@ -343,26 +324,18 @@ class VolkswagenIDSensor(VolkswagenIDBaseEntity, BinarySensorEntity):
         sensor: VolkswagenIdBinaryEntityDescription,
         we_connect: weconnect_cupra.WeConnect,
         coordinator: DataUpdateCoordinator,
-        index: int,
+        vin: str,
     ) -> None:
         """Initialize VolkswagenID vehicle sensor."""
-        super().__init__(we_connect, coordinator, index)
+        super().__init__(we_connect, coordinator, vin)
 
         self.entity_description = sensor
+        self.vehicle_domain = sensor.path[0]
         self._coordinator = coordinator
         self._attr_name = f"{self.data.nickname} {sensor.name}"
         self._attr_unique_id = f"{self.data.vin}-{sensor.key}"
 
     @property
-    def is_on(self) -> bool:
+    def is_on(self) -> bool | None:
         """Return true if sensor is on."""
-        try:
-            state = self.entity_description.value(self.data.domains)
-            if isinstance(state, bool):
-                return state
-
-            state = get_object_value(state)
-            return state == get_object_value(self.entity_description.on_value)
-
-        except KeyError:
-            return None
+        return self.entity_description.resolve(self.data)
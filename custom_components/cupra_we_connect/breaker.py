@@ -0,0 +1,45 @@
+"""Circuit breaker for the updates of a Cupra account."""
+from __future__ import annotations
+
+from datetime import timedelta
+import random
+
+from .const import BACKOFF_INITIAL, BACKOFF_JITTER, BACKOFF_MAX, BREAKER_THRESHOLD
+
+# Doublings of the initial delay, far beyond the max delay
+BACKOFF_MAX_DOUBLINGS = 8
+
+
+class CircuitBreaker:
+    """Count consecutive failed updates and back off once the circuit opens.
+
+    While open, the next update only probes the cloud with a single cheap
+    request (half-open) and goes on with the full update if that succeeds.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the breaker."""
+        self.failures = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Return true if the updates are backing off."""
+        return self.failures >= BREAKER_THRESHOLD
+
+    def record_success(self) -> bool:
+        """Close the circuit, return true if it was open."""
+        was_open = self.is_open
+        self.failures = 0
+        return was_open
+
+    def record_failure(self) -> None:
+        """Count a failed update or probe."""
+        self.failures += 1
+
+    def backoff(self) -> timedelta:
+        """Return the delay until the next probe, doubling with every failure."""
+        # Capped before the multiplication, timedelta overflows after ~40 doublings
+        exponent = min(self.failures - BREAKER_THRESHOLD, BACKOFF_MAX_DOUBLINGS)
+        delay = min(BACKOFF_INITIAL * 2**exponent, BACKOFF_MAX)
+        # Spread the probes of many installations after a cloud outage
+        return delay * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
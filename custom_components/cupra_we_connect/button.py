@@ -1,10 +1,19 @@
 """Button integration."""
+from functools import partial
+
 from weconnect_cupra import weconnect_cupra
 
 from homeassistant.components.button import ButtonEntity
 from homeassistant.helpers.entity import DeviceInfo
 
-from . import get_object_value, set_ac_charging_speed, set_climatisation, start_stop_charging
+from . import (
+    async_add_supported_entities,
+    async_send_command,
+    set_ac_charging_speed,
+    set_climatisation,
+    start_stop_charging,
+)
+from .accessors import keep_paths
 from .const import DOMAIN
 
 import logging
@@ -14,17 +23,15 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add buttons for passed config_entry in HA."""
     we_connect: weconnect_cupra.WeConnect = hass.data[DOMAIN][config_entry.entry_id]
-    vehicles = hass.data[DOMAIN][config_entry.entry_id + "_vehicles"]
 
-    entities = []
-    for vehicle in vehicles:  # weConnect.vehicles.items():
-        entities.append(VolkswagenIDStartClimateButton(vehicle, we_connect))
-        entities.append(VolkswagenIDStopClimateButton(vehicle, we_connect))
-        entities.append(VolkswagenIDStartChargingButton(vehicle, we_connect))
-        entities.append(VolkswagenIDStopChargingButton(vehicle, we_connect))
-        entities.append(VolkswagenIDToggleACChargeSpeed(vehicle, we_connect))
+    def candidates(vin, coordinator):
+        # Buttons erst anlegen, wenn das Auto den zugehörigen Status meldet
+        for button_class in BUTTONS:
+            yield button_class.path, partial(
+                button_class, coordinator.data, we_connect, config_entry.entry_id
+            )
 
-    async_add_entities(entities)
+    async_add_supported_entities(hass, config_entry, async_add_entities, candidates)
 
     return True
 
@@ -35,92 +42,115 @@ class CupraBaseButton(ButtonEntity):
     _attr_should_poll = False
     # Standardmäßig auf deaktiviert setzen, da die Controls als Switch vorhanden sind
     _attr_entity_registry_enabled_default = False
+    # Status im Snapshot, den das Auto für den Button melden muss
+    path: tuple[str, ...] = ()
 
-    def __init__(self, vehicle, we_connect):
+    def __init__(self, data, we_connect, entry_id):
+        # Nur die VIN behalten, der Snapshot wird bei jedem Update ersetzt
         self._we_connect = we_connect
-        self._vehicle = vehicle
-        
-        vin = getattr(vehicle.vin, "value", str(vehicle.vin))
-        
-        self._vin = vin
+        self._entry_id = entry_id
+        self._vin = data.vin
         self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, f"vw{vin}")},
+            identifiers={(DOMAIN, f"vw{data.vin}")},
             manufacturer="Cupra",
-            model=getattr(vehicle, "model", None),  
-            name=f"{vehicle.nickname}",
+            model=data.model,
+            name=data.nickname,
         )
 
 class VolkswagenIDStartClimateButton(CupraBaseButton):
-    def __init__(self, vehicle, we_connect):
-        super().__init__(vehicle, we_connect)
+    path = ("climatisation", "climatisationStatus", "climatisationState")
+
+    def __init__(self, data, we_connect, entry_id):
+        super().__init__(data, we_connect, entry_id)
         self._attr_name = "Start Climate"
         self._attr_unique_id = f"{self._vin}-start_climate"
 
     async def async_press(self) -> None:
         from . import set_climatisation
-        await self.hass.async_add_executor_job(
-            set_climatisation, self._vehicle.vin.value, self._we_connect, "start", 0
+        await async_send_command(
+            self.hass, self._entry_id, self._vin, "climatisation", set_climatisation, "start", 0
         )
 
 
 class VolkswagenIDStopClimateButton(CupraBaseButton):
-    def __init__(self, vehicle, we_connect):
-        super().__init__(vehicle, we_connect)
+    path = ("climatisation", "climatisationStatus", "climatisationState")
+
+    def __init__(self, data, we_connect, entry_id):
+        super().__init__(data, we_connect, entry_id)
         self._attr_name = "Stop Climate"
         self._attr_unique_id = f"{self._vin}-stop_climate"
 
     async def async_press(self) -> None:
         from . import set_climatisation
-        await self.hass.async_add_executor_job(
-            set_climatisation, self._vehicle.vin.value, self._we_connect, "stop", 0
+        await async_send_command(
+            self.hass, self._entry_id, self._vin, "climatisation", set_climatisation, "stop", 0
         )
 
 
 class VolkswagenIDStartChargingButton(CupraBaseButton):
-    def __init__(self, vehicle, we_connect):
-        super().__init__(vehicle, we_connect)
+    path = ("charging", "chargingStatus", "chargingState")
+
+    def __init__(self, data, we_connect, entry_id):
+        super().__init__(data, we_connect, entry_id)
         self._attr_name = "Start Charging"
         self._attr_unique_id = f"{self._vin}-start_charging"
 
     async def async_press(self) -> None:
         from . import start_stop_charging
-        await self.hass.async_add_executor_job(
-            start_stop_charging, self._vehicle.vin.value, self._we_connect, "start"
+        await async_send_command(
+            self.hass, self._entry_id, self._vin, "charging", start_stop_charging, "start"
         )
 
 
 class VolkswagenIDStopChargingButton(CupraBaseButton):
-    def __init__(self, vehicle, we_connect):
-        super().__init__(vehicle, we_connect)
+    path = ("charging", "chargingStatus", "chargingState")
+
+    def __init__(self, data, we_connect, entry_id):
+        super().__init__(data, we_connect, entry_id)
         self._attr_name = "Stop Charging"
         self._attr_unique_id = f"{self._vin}-stop_charging"
 
     async def async_press(self) -> None:
         from . import start_stop_charging
-        await self.hass.async_add_executor_job(
-            start_stop_charging, self._vehicle.vin.value, self._we_connect, "stop"
+        await async_send_command(
+            self.hass, self._entry_id, self._vin, "charging", start_stop_charging, "stop"
         )
 
 
 class VolkswagenIDToggleACChargeSpeed(CupraBaseButton):
-    def __init__(self, vehicle, we_connect):
-        super().__init__(vehicle, we_connect)
+    path = ("charging", "chargingSettings", "maxChargeCurrentAC")
+
+    def __init__(self, data, we_connect, entry_id):
+        super().__init__(data, we_connect, entry_id)
         self._attr_name = "Toggle AC Charge Speed"
         self._attr_unique_id = f"{self._vin}-toggle_ac_charge_speed"
 
     async def async_press(self) -> None:
-        from . import get_object_value, set_ac_charging_speed
+        from . import set_ac_charging_speed
 
-        current_state = get_object_value(
-            self._vehicle.domains["charging"]["chargingSettings"].maxChargeCurrentAC
-        )
+        # Aktueller Snapshot des Fahrzeugs, nach einem Neustart evtl. wiederhergestellt
+        coordinator = self.hass.data[DOMAIN][self._entry_id + "_coordinator"]
+        data = coordinator.vehicles.get(self._vin)
+        current_state = None if data is None else data.get(self.path)
 
         target = "reduced" if current_state == "maximum" else "maximum"
         _LOGGER.debug("Toggle AC charge speed for VIN %s -> %s", self._vin, target)
 
-        await self.hass.async_add_executor_job(
+        await async_send_command(
+            self.hass,
+            self._entry_id,
+            self._vin,
+            "ac_charge_speed",
             set_ac_charging_speed,
-            self._vehicle.vin.value,
-            self._we_connect,
             target,
-        )
\ No newline at end of file
+        )
+
+
+BUTTONS = (
+    VolkswagenIDStartClimateButton,
+    VolkswagenIDStopClimateButton,
+    VolkswagenIDStartChargingButton,
+    VolkswagenIDStopChargingButton,
+    VolkswagenIDToggleACChargeSpeed,
+)
+keep_paths(button_class.path for button_class in BUTTONS)
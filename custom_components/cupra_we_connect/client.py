@@ -0,0 +1,303 @@
+"""Async read access to the Cupra API on Home Assistant's aiohttp session."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+import logging
+import time
+from typing import Any, TypeVar
+
+import aiohttp
+
+from weconnect_cupra import weconnect_cupra
+from weconnect_cupra.auth.auth_util import addBearerAuthHeader
+from weconnect_cupra.errors import AuthentificationError, RetrievalError
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, REQUEST_TIMEOUT, VALIDATED_SESSION_TTL
+from .metrics import AccountMetrics, endpoint_of, track_library_requests
+from .ratelimit import PRIORITY_POLL, RateLimiter, parse_retry_after
+from .storage import entry_store
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+STORAGE_VERSION = 1
+# Tokens are written at most once a minute
+STORAGE_SAVE_DELAY = 60
+
+# Let aiohttp negotiate these itself
+_SKIPPED_HEADERS = ("accept-encoding", "content-type")
+
+
+def session_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the session tokens of a config entry."""
+    return entry_store(hass, entry_id, "session", STORAGE_VERSION)
+
+
+def restore_session(session, stored: dict[str, Any]) -> bool:
+    """Put persisted tokens back into a library session."""
+    if not stored.get("token") or not stored.get("user_id"):
+        return False
+    session.token = stored["token"]
+    # The library only learns the user id during the web login
+    session._MyCupraSession__userId = stored["user_id"]  # pylint: disable=protected-access
+    return True
+
+
+def account_key(data: dict[str, Any]) -> tuple[str, str]:
+    """Return the key identifying the account of a config entry."""
+    return (data["service"], data["username"])
+
+
+@callback
+def async_stash_validated_session(
+    hass: HomeAssistant, data: dict[str, Any], we_connect: weconnect_cupra.WeConnect
+) -> None:
+    """Keep a client logged in by the config flow for the entry setup."""
+    key = account_key(data)
+    sessions = hass.data.setdefault(DOMAIN, {}).setdefault("validated_sessions", {})
+    sessions[key] = (we_connect, time.monotonic())
+
+    @callback
+    def _expire() -> None:
+        if key in sessions and sessions[key][0] is we_connect:
+            del sessions[key]
+
+    hass.loop.call_later(VALIDATED_SESSION_TTL.total_seconds(), _expire)
+
+
+@callback
+def async_pop_validated_session(
+    hass: HomeAssistant, data: dict[str, Any]
+) -> weconnect_cupra.WeConnect | None:
+    """Return the client validated by the config flow if it is still fresh."""
+    sessions = hass.data.get(DOMAIN, {}).get("validated_sessions", {})
+    if (validated := sessions.pop(account_key(data), None)) is None:
+        return None
+    we_connect, validated_at = validated
+    if (
+        we_connect.password != data["password"]
+        or time.monotonic() - validated_at > VALIDATED_SESSION_TTL.total_seconds()
+    ):
+        return None
+    return we_connect
+
+
+@callback
+def async_register_account_entry(hass: HomeAssistant, entry) -> str:
+    """Count a config entry as user of its account.
+
+    Return the id of the entry that logs in and polls for all entries of the
+    account, the first one set up.
+    """
+    accounts = hass.data.setdefault(DOMAIN, {}).setdefault("accounts", {})
+    entry_ids = accounts.setdefault(account_key(entry.data), [])
+    if entry.entry_id not in entry_ids:
+        entry_ids.append(entry.entry_id)
+    return entry_ids[0]
+
+
+@callback
+def async_release_account_entry(hass: HomeAssistant, entry) -> str | None:
+    """Stop counting a config entry as user of its account.
+
+    Return the id of the entry taking over if this one polled for the account.
+    """
+    accounts = hass.data.get(DOMAIN, {}).get("accounts", {})
+    key = account_key(entry.data)
+    if entry.entry_id not in (entry_ids := accounts.get(key, [])):
+        return None
+    polling = entry_ids[0] == entry.entry_id
+    entry_ids.remove(entry.entry_id)
+    if not entry_ids:
+        del accounts[key]
+        return None
+    return entry_ids[0] if polling else None
+
+
+class AsyncCupraClient:
+    """Issue the read requests of a WeConnect session on the event loop.
+
+    Tokens are still obtained by the library (in the executor), only the
+    authorized GET requests are sent through the shared, pooled aiohttp session.
+    All blocking library calls of the account run one after the other in a
+    single worker thread, the library isn't thread-safe and a hanging request
+    can't tie up more than that one thread. Calls that change the cars (full
+    update, commands) hold vehicles_lock, as does the event loop while it
+    merges fetched domains into the cars or reads them.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        we_connect: weconnect_cupra.WeConnect,
+        store: Store | None = None,
+        session: aiohttp.ClientSession | None = None,
+        limiter: RateLimiter | None = None,
+        metrics: AccountMetrics | None = None,
+    ) -> None:
+        """Initialize the client."""
+        self._hass = hass
+        self._we_connect = we_connect
+        self._store = store
+        self.limiter = limiter or RateLimiter(hass)
+        self.metrics = metrics or AccountMetrics()
+        # Logins, token refreshes, full updates and commands of the library
+        track_library_requests(hass, we_connect.session, self.metrics)
+        self._session = session or async_get_clientsession(hass)
+        self._timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        self._saved_token: str | None = None
+        self._token_lock = asyncio.Lock()
+        # The library objects of the cars are only used by one thread at a time
+        self.vehicles_lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{DOMAIN}_worker"
+        )
+
+    async def async_run_job(self, target: Callable[..., _T], *args: Any) -> _T:
+        """Run a blocking library call in the worker thread of the account.
+
+        Calls queued behind a hanging one are dropped if their caller gives up.
+        """
+        return await self._hass.loop.run_in_executor(self._executor, target, *args)
+
+    def shutdown(self) -> None:
+        """Stop the worker thread, dropping the calls that didn't start yet."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def async_login(self) -> None:
+        """Log in, reusing the persisted tokens of a previous run if possible."""
+
+        session = self._we_connect.session
+        if self._store is not None and (stored := await self._store.async_load()):
+            if restore_session(session, stored):
+                _LOGGER.debug("Reusing tokens from previous session")
+                self._saved_token = session.accessToken
+
+        with self.metrics.measure("login"):
+            if session.authorized:
+                # Refreshes the tokens if they expired, logs in if that fails
+                await self.async_ensure_token()
+            else:
+                await self.async_run_job(self._we_connect.login)
+        self.async_save_session()
+
+    @callback
+    def async_save_session(self) -> None:
+        """Persist the session tokens if they changed."""
+        session = self._we_connect.session
+        if self._store is None or session.accessToken == self._saved_token:
+            return
+        self._saved_token = session.accessToken
+        self._store.async_delay_save(
+            lambda: {
+                "token": session.token,
+                "user_id": getattr(session, "user_id", None),
+            },
+            STORAGE_SAVE_DELAY,
+        )
+
+    def _refresh_token(self) -> None:
+        """Refresh the access token, fall back to a full login."""
+        session = self._we_connect.session
+        if session.refreshToken is None:
+            session.login()
+            return
+        try:
+            session.refresh()
+        except (AuthentificationError, RetrievalError):
+            _LOGGER.debug("Refreshing tokens failed, logging in again")
+            session.login()
+
+    async def async_ensure_token(self) -> None:
+        """Make sure the session holds a valid access token."""
+        session = self._we_connect.session
+        # Concurrent requests wait for the refresh of the first one
+        async with self._token_lock:
+            if not session.authorized or session.expired:
+                with self.metrics.measure("token_refresh"):
+                    await self.async_run_job(self._refresh_token)
+
+    def _headers(self) -> dict[str, str]:
+        """Return the headers the library would send for an authorized request."""
+        session = self._we_connect.session
+        headers = {
+            key: value
+            for key, value in session.headers.items()
+            if key.lower() not in _SKIPPED_HEADERS
+        }
+        addBearerAuthHeader(session.accessToken, headers)
+        if (user_id := getattr(session, "user_id", None)) is not None:
+            headers["user-id"] = user_id
+        return headers
+
+    async def _async_send(
+        self, url: str, priority: int, timeout: aiohttp.ClientTimeout
+    ) -> tuple[int, Any]:
+        """Send one authorized GET, return the status and the JSON on success."""
+        await self.limiter.async_acquire(priority)
+        with self.metrics.measure("request", endpoint=endpoint_of(url)) as span:
+            async with self._session.get(
+                url, headers=self._headers(), allow_redirects=False, timeout=timeout
+            ) as response:
+                body = await response.read()
+                span.set(status=response.status, bytes=len(body))
+                self.metrics.record_request(url, len(body), response.status)
+                self._check_rate_limit(response)
+                if response.status not in (HTTPStatus.OK, HTTPStatus.MULTI_STATUS):
+                    span.fail(f"HTTP {response.status}")
+                    return response.status, None
+                return response.status, await response.json(content_type=None)
+
+    def _check_rate_limit(self, response: aiohttp.ClientResponse) -> None:
+        """Pause all requests if the server says there were too many."""
+        if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+            self.limiter.retry_after(
+                parse_retry_after(response.headers.get("Retry-After"))
+            )
+            raise RetrievalError("Too many requests")
+
+    async def async_get(
+        self, url: str, priority: int = PRIORITY_POLL, timeout: float | None = None
+    ) -> Any:
+        """Fetch JSON from the API, re-authorizing once if the server asks for it."""
+
+        client_timeout = (
+            self._timeout if timeout is None else aiohttp.ClientTimeout(total=timeout)
+        )
+        session = self._we_connect.session
+        try:
+            await self.async_ensure_token()
+            token = session.accessToken
+            status, data = await self._async_send(url, priority, client_timeout)
+            if status in (HTTPStatus.OK, HTTPStatus.MULTI_STATUS):
+                return data
+            if status != HTTPStatus.UNAUTHORIZED:
+                raise RetrievalError(f"Could not fetch data. Status Code was: {status}")
+
+            # Requests rejected together log in once, the others retry with
+            # the token of the first one
+            async with self._token_lock:
+                if session.accessToken == token:
+                    _LOGGER.info("Server asks for new authorization")
+                    await self.async_run_job(self._we_connect.login)
+            status, data = await self._async_send(url, priority, client_timeout)
+            if status not in (HTTPStatus.OK, HTTPStatus.MULTI_STATUS):
+                raise RetrievalError(
+                    "Could not fetch data even after re-authorization. "
+                    f"Status Code was: {status}"
+                )
+            return data
+        except asyncio.TimeoutError:
+            self.metrics.record_error("timeout")
+            raise
+        except aiohttp.ClientError:
+            self.metrics.record_error("connection")
+            raise
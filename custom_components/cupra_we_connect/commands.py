@@ -0,0 +1,328 @@
+"""Per-vehicle queue for the commands sent to the cars."""
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any
+
+from weconnect_cupra import weconnect_cupra
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .accessors import VehicleSnapshot, keep_paths
+from .const import (
+    CHARGING_ACTIVE_STATES,
+    CLIMATISATION_INACTIVE_STATES,
+    COMMAND_CONFIRM_DELAY,
+    COMMAND_CONFIRM_MAX_DELAY,
+    COMMAND_CONFIRM_TIMEOUT,
+    COMMAND_DEBOUNCE,
+    DOMAIN,
+)
+from .client import AsyncCupraClient
+from .metrics import AccountMetrics
+from .ratelimit import PRIORITY_COMMAND
+from .refresh import DOMAIN_REFRESH_ERRORS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Command -> (vehicle domain it is serialized in, debounced setting write)
+COMMANDS: dict[str, tuple[str, bool]] = {
+    "charging": ("charging", False),
+    "target_soc": ("charging", True),
+    "ac_charge_speed": ("charging", True),
+    "climatisation": ("climatisation", False),
+    "target_temperature": ("climatisation", True),
+}
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+
+class _QueuedCommand:
+    """A command waiting to be sent, later submissions replace its arguments."""
+
+    def __init__(self, job: Callable[..., bool], args: tuple) -> None:
+        """Initialize the command."""
+        self.job = job
+        self.args = args
+        self.submitted = time.monotonic()
+        self.waiters: list[asyncio.Future] = []
+
+
+class CommandQueue:
+    """Debounce, coalesce and serialize the commands of an account.
+
+    A command that is still queued is superseded by a newer command of the
+    same kind for the same car, all callers get the result of the one that is
+    sent. At most one request per car and domain is in flight.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        we_connect: weconnect_cupra.WeConnect,
+        client: AsyncCupraClient,
+        on_sent: Callable[[str, str, tuple], Awaitable[None]],
+    ) -> None:
+        """Initialize the queue."""
+        self._hass = hass
+        self._entry = entry
+        self._we_connect = we_connect
+        self._client = client
+        self._on_sent = on_sent
+        self._queued: dict[tuple[str, str], _QueuedCommand] = {}
+        self._locks: defaultdict[tuple[str, str], asyncio.Lock] = defaultdict(
+            asyncio.Lock
+        )
+
+    async def async_send(
+        self, vin: str, command: str, job: Callable[..., bool], *args: Any
+    ) -> bool:
+        """Queue job(vin, we_connect, *args) and return its result."""
+
+        key = (vin, command)
+        waiter = self._hass.loop.create_future()
+        if (queued := self._queued.get(key)) is not None:
+            _LOGGER.debug("Superseding queued %s command for %s", command, vin)
+            queued.job = job
+            queued.args = args
+            queued.submitted = time.monotonic()
+        else:
+            queued = self._queued[key] = _QueuedCommand(job, args)
+            self._entry.async_create_background_task(
+                self._hass,
+                self._async_run(vin, command, queued),
+                f"{DOMAIN} {command} command",
+            )
+        queued.waiters.append(waiter)
+        return await waiter
+
+    async def _async_run(self, vin: str, command: str, queued: _QueuedCommand) -> None:
+        """Send a queued command once it settled and its domain is free."""
+        domain, debounced = COMMANDS[command]
+        key = (vin, command)
+
+        try:
+            if debounced:
+                # Wait until the value stopped changing, e.g. a dragged slider
+                while (
+                    delay := queued.submitted
+                    + COMMAND_DEBOUNCE.total_seconds()
+                    - time.monotonic()
+                ) > 0:
+                    await asyncio.sleep(delay)
+
+            async with self._locks[(vin, domain)]:
+                # From here on a new submission queues a new command
+                del self._queued[key]
+                with self._client.metrics.measure(
+                    "command", root=True, vin=vin, command=command
+                ) as span:
+                    await self._client.limiter.async_acquire(PRIORITY_COMMAND)
+                    # The job changes the car in the worker thread
+                    async with self._client.vehicles_lock:
+                        result = await self._client.async_run_job(
+                            queued.job, vin, self._we_connect, *queued.args
+                        )
+                    if not result:
+                        span.fail("Command was not sent")
+        except Exception as exc:  # pylint: disable=broad-except
+            for waiter in queued.waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+        else:
+            for waiter in queued.waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
+            if result:
+                # The command went out, a failing follow-up doesn't change that
+                try:
+                    await self._on_sent(vin, command, queued.args)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception(
+                        "Following up on the %s command of %s failed", command, vin
+                    )
+        finally:
+            if self._queued.get(key) is queued:
+                del self._queued[key]
+            # Only left over if the entry is unloaded meanwhile
+            for waiter in queued.waiters:
+                waiter.cancel()
+
+
+# Values the commands are read back from
+keep_paths(
+    (
+        ("charging", "chargingStatus", "chargingState"),
+        ("charging", "chargingSettings", "targetSOC_pct"),
+        ("charging", "chargingSettings", "maxChargeCurrentAC"),
+        ("climatisation", "climatisationStatus", "climatisationState"),
+        ("climatisation", "climatisationSettings", "targetTemperature_C"),
+    )
+)
+
+
+def _is_charging(data: VehicleSnapshot) -> bool:
+    """Return true if the car reports that it is charging."""
+    state = data.get(("charging", "chargingStatus", "chargingState"))
+    return str(state).lower() in CHARGING_ACTIVE_STATES
+
+
+def _is_climatising(data: VehicleSnapshot) -> bool:
+    """Return true if the car reports that it is climatising."""
+    state = data.get(("climatisation", "climatisationStatus", "climatisationState"))
+    return state is not None and str(state).lower() not in CLIMATISATION_INACTIVE_STATES
+
+
+def requested_state(
+    command: str, args: tuple
+) -> Callable[[VehicleSnapshot], bool] | None:
+    """Return a check if a car reports what a command asked for.
+
+    None if nothing of the command can be read back from the car.
+    """
+    checks: list[Callable[[VehicleSnapshot], bool]] = []
+
+    if command == "charging" and args[0] in ("start", "stop"):
+        charging = args[0] == "start"
+        checks.append(lambda data: _is_charging(data) == charging)
+    elif command in ("climatisation", "target_temperature"):
+        operation, target_temperature = args
+        if operation in ("start", "stop"):
+            climatising = operation == "start"
+            checks.append(lambda data: _is_climatising(data) == climatising)
+        if target_temperature > 10:
+            checks.append(
+                lambda data: data.get(
+                    ("climatisation", "climatisationSettings", "targetTemperature_C")
+                )
+                == float(target_temperature)
+            )
+    elif command == "target_soc" and int(args[0]) > 10:
+        checks.append(
+            lambda data: data.get(("charging", "chargingSettings", "targetSOC_pct"))
+            == int(args[0])
+        )
+    elif command == "ac_charge_speed":
+        checks.append(
+            lambda data: str(
+                data.get(("charging", "chargingSettings", "maxChargeCurrentAC"))
+            ).lower()
+            == str(args[0]).lower()
+        )
+
+    if not checks:
+        return None
+    return lambda data: all(check(data) for check in checks)
+
+
+@dataclass
+class CommandOutcome:
+    """Outcome of the last command sent to a car."""
+
+    command: str
+    args: tuple
+    state: str = PENDING
+
+
+class CommandTracker:
+    """Confirm sent commands by re-polling only the domain they changed.
+
+    The domain is polled with a growing delay until the car reports the
+    requested state (confirmed) or COMMAND_CONFIRM_TIMEOUT passed (failed).
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        async_refresh_domain: Callable[[str, str], Awaitable[VehicleSnapshot | None]],
+        on_change: Callable[[str], None],
+        metrics: AccountMetrics,
+    ) -> None:
+        """Initialize the tracker."""
+        self._hass = hass
+        self._entry = entry
+        self._metrics = metrics
+        self._async_refresh_domain = async_refresh_domain
+        self._on_change = on_change
+        self._outcomes: dict[tuple[str, str], CommandOutcome] = {}
+        self._tasks: dict[tuple[str, str], asyncio.Task] = {}
+        # Last command per VIN
+        self.latest: dict[str, CommandOutcome] = {}
+
+    def pending(self, vin: str, command: str) -> tuple | None:
+        """Return the arguments of a command still waiting for confirmation."""
+        outcome = self._outcomes.get((vin, command))
+        if outcome is None or outcome.state != PENDING:
+            return None
+        return outcome.args
+
+    @callback
+    def async_track(self, vin: str, command: str, args: tuple) -> bool:
+        """Start confirming a sent command, false if it can't be confirmed."""
+        if (check := requested_state(command, args)) is None:
+            return False
+
+        key = (vin, command)
+        if (task := self._tasks.pop(key, None)) is not None:
+            task.cancel()
+        outcome = self._outcomes[key] = self.latest[vin] = CommandOutcome(command, args)
+        self._tasks[key] = self._entry.async_create_background_task(
+            self._hass,
+            self._async_confirm(vin, command, outcome, check),
+            f"{DOMAIN} confirm {command} command",
+        )
+        self._on_change(vin)
+        return True
+
+    async def _async_confirm(
+        self,
+        vin: str,
+        command: str,
+        outcome: CommandOutcome,
+        check: Callable[[VehicleSnapshot], bool],
+    ) -> None:
+        """Re-poll the domain of a command until its outcome is known."""
+        domain = COMMANDS[command][0]
+        deadline = time.monotonic() + COMMAND_CONFIRM_TIMEOUT.total_seconds()
+        delay = COMMAND_CONFIRM_DELAY.total_seconds()
+
+        try:
+            with self._metrics.measure(
+                "confirm", root=True, vin=vin, command=command
+            ) as span:
+                while True:
+                    await asyncio.sleep(delay)
+                    try:
+                        data = await self._async_refresh_domain(vin, domain)
+                    except DOMAIN_REFRESH_ERRORS as exc:
+                        _LOGGER.debug(
+                            "Failed to re-poll %s of %s - %s", domain, vin, exc
+                        )
+                    else:
+                        if data is not None and check(data):
+                            outcome.state = CONFIRMED
+                            break
+                    if (remaining := deadline - time.monotonic()) <= 0:
+                        _LOGGER.warning(
+                            "Car %s did not confirm the %s command", vin, command
+                        )
+                        outcome.state = FAILED
+                        span.fail("Car did not confirm the command")
+                        break
+                    delay = min(
+                        delay * 2, COMMAND_CONFIRM_MAX_DELAY.total_seconds(), remaining
+                    )
+        finally:
+            if self._tasks.get((vin, command)) is asyncio.current_task():
+                del self._tasks[(vin, command)]
+            self._on_change(vin)
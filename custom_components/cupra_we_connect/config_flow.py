@@ -1,21 +1,34 @@
 """Config flow for Cupra We Connect integration."""
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
 import voluptuous as vol
 
 from weconnect_cupra import weconnect_cupra
+from weconnect_cupra.errors import AuthentificationError, RetrievalError
 from weconnect_cupra.service import Service
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.selector import selector
 
-from .const import DOMAIN
+from .client import async_stash_validated_session
+from .const import (
+    CONF_DAILY_REQUEST_BUDGET,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_REQUESTS_PER_MINUTE,
+    DAILY_REQUEST_BUDGET,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DOMAIN,
+    MAX_CONCURRENT_REQUESTS,
+    REQUEST_TIMEOUT,
+    REQUESTS_PER_MINUTE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,6 +44,8 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+STEP_REAUTH_DATA_SCHEMA = vol.Schema({vol.Required("password"): str})
+
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
@@ -42,16 +57,23 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
         password=data["password"],
         service=Service(data["service"]),
         updateAfterLogin=False,
-        loginOnInit=False
+        loginOnInit=False,
+        timeout=REQUEST_TIMEOUT
     )
 
-    # TODO: ADD Validation on credentials
-
-    await hass.async_add_executor_job(we_connect.login)
-    await hass.async_add_executor_job(we_connect.update)
+    # Only check the credentials, the entry setup fetches the vehicles
+    try:
+        await hass.async_add_executor_job(we_connect.login)
+    except AuthentificationError as err:
+        raise InvalidAuth from err
+    except RetrievalError as err:
+        raise CannotConnect from err
 
     # vin = next(iter(we_connect.vehicles.items()))[0]
 
+    # Hand the logged in client to async_setup_entry
+    async_stash_validated_session(hass, data, we_connect)
+
     return {"title": "Cupra We Connect"}
 
 
@@ -60,6 +82,16 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    _reauth_entry: config_entries.ConfigEntry | None = None
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -89,6 +121,87 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
         )
 
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
+        """Handle rejected credentials of an existing entry."""
+        self._reauth_entry = self.hass.config_entries.async_get_entry(
+            self.context["entry_id"]
+        )
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Ask for the new password."""
+        assert self._reauth_entry is not None
+        errors = {}
+
+        if user_input is not None:
+            data = {**self._reauth_entry.data, "password": user_input["password"]}
+            try:
+                await validate_input(self.hass, data)
+            except CannotConnect:
+                errors["base"] = "cannot_connect"
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception during reauth", exc_info=1)
+                errors["base"] = "unknown"
+            else:
+                return self.async_update_reload_and_abort(
+                    self._reauth_entry, data=data
+                )
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=STEP_REAUTH_DATA_SCHEMA,
+            description_placeholders={"username": self._reauth_entry.data["username"]},
+            errors=errors,
+        )
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options of a Cupra We Connect entry."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_MAX_CONCURRENT_REQUESTS,
+                        default=self.config_entry.options.get(
+                            CONF_MAX_CONCURRENT_REQUESTS,
+                            DEFAULT_MAX_CONCURRENT_REQUESTS,
+                        ),
+                    ): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=MAX_CONCURRENT_REQUESTS)
+                    ),
+                    vol.Required(
+                        CONF_REQUESTS_PER_MINUTE,
+                        default=self.config_entry.options.get(
+                            CONF_REQUESTS_PER_MINUTE, REQUESTS_PER_MINUTE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(
+                        CONF_DAILY_REQUEST_BUDGET,
+                        default=self.config_entry.options.get(
+                            CONF_DAILY_REQUEST_BUDGET, DAILY_REQUEST_BUDGET
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                }
+            ),
+        )
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -1,3 +1,72 @@
 """Constants for the Cupra We Connect integration."""
 
+from datetime import timedelta
+
 DOMAIN = "cupra_we_connect"
+
+# Raw state values as reported by the different library versions
+CHARGING_ACTIVE_STATES = ("charging", "dc_charging", "ac_charging", "on")
+CLIMATISATION_INACTIVE_STATES = ("off", "aus", "false", "inactive", "stopped", "0", "")
+
+# Timeout in seconds of a single request to the Cupra API
+REQUEST_TIMEOUT = 10
+
+# Requests per account: sustained rate, burst and daily budget. A part of the
+# budget is reserved for commands, background polls stop before it is used up.
+# Rate and budget are configurable in the options of the entry, for fleets
+CONF_REQUESTS_PER_MINUTE = "requests_per_minute"
+CONF_DAILY_REQUEST_BUDGET = "daily_request_budget"
+REQUESTS_PER_MINUTE = 12
+REQUEST_BURST = 10
+DAILY_REQUEST_BUDGET = 2000
+COMMAND_BUDGET_RESERVE = 0.1
+# Pause after a 429 response without Retry-After header
+RETRY_AFTER_DEFAULT = timedelta(seconds=60)
+
+# Poll cadence derived from what the cars are doing, see get_update_interval()
+UPDATE_INTERVAL_DEFAULT = timedelta(minutes=5)
+UPDATE_INTERVAL_ACTIVE = timedelta(seconds=60)
+UPDATE_INTERVAL_IDLE = timedelta(minutes=30)
+UPDATE_INTERVAL_BURST = timedelta(seconds=30)
+COMMAND_BURST_DURATION = timedelta(minutes=3)
+
+# Setting writes are sent once the value didn't change for this long
+COMMAND_DEBOUNCE = timedelta(seconds=2)
+
+# Re-poll of the commanded domain until the car reports the requested state,
+# starting after the first delay and doubling up to the max delay
+COMMAND_CONFIRM_DELAY = timedelta(seconds=10)
+COMMAND_CONFIRM_MAX_DELAY = timedelta(seconds=60)
+COMMAND_CONFIRM_TIMEOUT = timedelta(minutes=3)
+
+# Updates back off after this many failures in a row, the delay between the
+# probes doubles up to the max and varies by the jitter fraction
+BREAKER_THRESHOLD = 3
+BACKOFF_INITIAL = timedelta(minutes=5)
+BACKOFF_MAX = timedelta(hours=1)
+BACKOFF_JITTER = 0.2
+
+# Requests of one account in flight at the same time while refreshing the
+# domains of all cars, configurable in the options of the entry
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+MAX_CONCURRENT_REQUESTS = 16
+
+# Spread the polls of several accounts and Home Assistant instances: the first
+# live refresh after a restart waits a stable per-entry part of the spread,
+# every poll interval varies by the jitter fraction
+FIRST_REFRESH_SPREAD = timedelta(seconds=60)
+POLL_JITTER = 0.1
+# Full account updates running at the same time in this Home Assistant
+MAX_CONCURRENT_ACCOUNT_UPDATES = 2
+
+# Finished traces of refreshes and commands kept per account, and the file in
+# the config directory they are exported to by default
+TRACE_BUFFER_SIZE = 200
+TRACE_EXPORT_FILE = "cupra_we_connect_traces.jsonl"
+
+# Full update interval picking up added/removed cars and their capabilities
+VEHICLE_LIST_MAX_AGE = timedelta(hours=1)
+
+# How long a client validated by the config flow can be reused by the entry setup
+VALIDATED_SESSION_TTL = timedelta(minutes=5)
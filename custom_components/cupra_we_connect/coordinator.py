@@ -0,0 +1,408 @@
+"""Coordinators polling the cars of an account."""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import logging
+import time
+
+from weconnect_cupra import weconnect_cupra
+from weconnect_cupra.elements.access_control_state import AccessControlState
+from weconnect_cupra.elements.connection_state import ConnectionState
+from weconnect_cupra.errors import (
+    AuthentificationError,
+    TemporaryAuthentificationError,
+)
+
+from homeassistant.config_entries import ConfigEntry, current_entry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+
+from .accessors import VehicleSnapshot, get_object_value, keep_paths
+from .breaker import CircuitBreaker
+from .client import AsyncCupraClient
+from .commands import CommandQueue, CommandTracker
+from .const import (
+    BREAKER_THRESHOLD,
+    CHARGING_ACTIVE_STATES,
+    CLIMATISATION_INACTIVE_STATES,
+    COMMAND_BURST_DURATION,
+    DOMAIN,
+    UPDATE_INTERVAL_ACTIVE,
+    UPDATE_INTERVAL_BURST,
+    UPDATE_INTERVAL_DEFAULT,
+    UPDATE_INTERVAL_IDLE,
+    VEHICLE_LIST_MAX_AGE,
+)
+from .metrics import MeasuredCoordinator
+from .ratelimit import BudgetExhausted
+from .refresh import DomainRefresher
+from .schedule import jittered
+from .snapshot import SNAPSHOT_SAVE_DELAY, dump_vehicles, snapshot_store
+
+_LOGGER = logging.getLogger(__name__)
+
+# Values the poll cadence depends on
+keep_paths(
+    (
+        ("charging", "chargingStatus", "chargingState"),
+        ("climatisation", "climatisationStatus", "climatisationState"),
+        ("parking", "parkingPosition", "latitude"),
+        ("access", "accessStatus", "doorLockStatus"),
+        ("status", "connectionStatus", "connectionState"),
+    )
+)
+
+
+def is_vehicle_active(data: VehicleSnapshot) -> bool:
+    """Return true if the vehicle is charging or climatising."""
+    charging_state = data.get(("charging", "chargingStatus", "chargingState"))
+    climatisation_state = data.get(
+        ("climatisation", "climatisationStatus", "climatisationState")
+    )
+    return str(charging_state).lower() in CHARGING_ACTIVE_STATES or (
+        climatisation_state is not None
+        and str(climatisation_state).lower() not in CLIMATISATION_INACTIVE_STATES
+    )
+
+
+def is_vehicle_idle(data: VehicleSnapshot) -> bool:
+    """Return true if the vehicle is parked, locked and offline."""
+    parked = data.get(("parking", "parkingPosition", "latitude")) is not None
+    locked = data.get(("access", "accessStatus", "doorLockStatus")) == get_object_value(
+        AccessControlState.LockState.LOCKED
+    )
+    online = data.get(
+        ("status", "connectionStatus", "connectionState")
+    ) == get_object_value(ConnectionState.ConnectionState.ONLINE)
+    return parked and locked and not online
+
+
+def get_update_interval(vehicles, last_command: float | None) -> timedelta:
+    """Derive the next poll interval from the last vehicle snapshot."""
+
+    if (
+        last_command is not None
+        and time.monotonic() - last_command < COMMAND_BURST_DURATION.total_seconds()
+    ):
+        return UPDATE_INTERVAL_BURST
+    if any(is_vehicle_active(data) for data in vehicles.values()):
+        return UPDATE_INTERVAL_ACTIVE
+    if vehicles and all(is_vehicle_idle(data) for data in vehicles.values()):
+        return UPDATE_INTERVAL_IDLE
+    return UPDATE_INTERVAL_DEFAULT
+
+
+def previous_data(coordinator: DataUpdateCoordinator, err: Exception):
+    """Return the last known data of a coordinator, fail if there is none yet."""
+    if not coordinator.data:
+        raise UpdateFailed("No vehicle data received yet") from err
+    return coordinator.data
+
+
+def update_failed(
+    coordinator: AccountCoordinator | VehicleCoordinator,
+    err: Exception,
+    message: str,
+    exc_info: bool = False,
+):
+    """Count a failed update, back off if the cloud keeps failing."""
+    breaker = coordinator.breaker
+    breaker.record_failure()
+    coordinator.client.metrics.record_error(f"update_{type(err).__name__}")
+    if breaker.failures == 1:
+        _LOGGER.error(message, exc_info=exc_info)
+    elif breaker.failures == BREAKER_THRESHOLD:
+        _LOGGER.warning("Cupra cloud keeps failing, backing off - %s", err)
+    else:
+        _LOGGER.debug("%s - %s", message, err)
+    if breaker.is_open:
+        coordinator.update_interval = breaker.backoff()
+    return previous_data(coordinator, err)
+
+
+class AccountCoordinator(DataUpdateCoordinator[dict[str, VehicleSnapshot]]):
+    """Run the full update picking up added and removed cars of an account.
+
+    Every car refreshes its own data with a VehicleCoordinator, the commands
+    sent to the cars are queued and tracked here.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        we_connect: weconnect_cupra.WeConnect,
+        client: AsyncCupraClient,
+        refresher: DomainRefresher,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass, _LOGGER, name=DOMAIN, update_interval=VEHICLE_LIST_MAX_AGE
+        )
+        self.entry = entry
+        self.we_connect = we_connect
+        self.client = client
+        self.refresher = refresher
+        self.breaker = CircuitBreaker()
+        self.snapshot = snapshot_store(hass, entry.entry_id)
+        # Last known data of every car, restored or taken after an update
+        self.vehicles: dict[str, VehicleSnapshot] = {}
+        self.vehicle_coordinators: dict[str, VehicleCoordinator] = {}
+        self.last_command: dict[str, float] = {}
+        self.tracker = CommandTracker(
+            hass,
+            entry,
+            self.async_refresh_domain,
+            self.async_command_changed,
+            client.metrics,
+        )
+        self.commands = CommandQueue(
+            hass, entry, we_connect, client, self.async_command_accepted
+        )
+
+    async def _async_update_data(self) -> dict[str, VehicleSnapshot]:
+        """Fetch the cars of the account and all their data from Cupra API."""
+        refresher = self.refresher
+        try:
+            if self.breaker.is_open:
+                # Half-open, only a full update once the cloud answers again
+                await asyncio.wait_for(refresher.async_probe(), timeout=120.0)
+            await asyncio.wait_for(refresher.async_update(), timeout=120.0)
+        except BudgetExhausted as err:
+            _LOGGER.debug("Skipping update - %s", err)
+            self.update_interval = jittered(
+                self.client.limiter.paced_interval(
+                    VEHICLE_LIST_MAX_AGE, refresher.full_update_cost()
+                )
+            )
+            return previous_data(self, err)
+        except TemporaryAuthentificationError as err:
+            return update_failed(
+                self, err, "Temporary authentication error at Cupra cloud"
+            )
+        except AuthentificationError as err:
+            # Starts the reauth flow
+            raise ConfigEntryAuthFailed(err) from err
+        except asyncio.TimeoutError as err:
+            previous = update_failed(self, err, "Timeout updating weconnect_cupra")
+            if self.client.vehicles_lock.locked():
+                # The shielded update still changes the cars in the worker
+                return previous
+            # Publish the domains that did arrive until then
+            return await self.async_current_vehicles() or previous
+        except Exception as err:
+            return update_failed(
+                self,
+                err,
+                "Unknown error while updating weconnect_cupra",
+                exc_info=True,
+            )
+
+        if self.breaker.record_success():
+            _LOGGER.info("Cupra cloud is reachable again")
+        vehicles = await self.async_current_vehicles()
+        self.client.async_save_session()
+        self.async_save_snapshot()
+        self.update_interval = jittered(
+            self.client.limiter.paced_interval(
+                VEHICLE_LIST_MAX_AGE, refresher.full_update_cost()
+            )
+        )
+        return vehicles
+
+    async def async_current_vehicle(self, vin: str) -> VehicleSnapshot | None:
+        """Take a snapshot of the current state of a library vehicle for the entities."""
+        # Never while the worker merges an update into the library cars
+        async with self.client.vehicles_lock:
+            if (vehicle := self.we_connect.vehicles.get(vin)) is None:
+                return None
+            data = VehicleSnapshot.from_vehicle(
+                vehicle, self.refresher.updated_at.get(vin)
+            )
+        self.vehicles[vin] = data
+        return data
+
+    async def async_current_vehicles(self) -> dict[str, VehicleSnapshot]:
+        """Take snapshots of the current state of all library vehicles for the entities."""
+        vehicles = {}
+
+        async with self.client.vehicles_lock:
+            for vin, vehicle in self.we_connect.vehicles.items():
+                # TODO this needs to be done in validate_input so we can warn
+                # user if their vehicle is unsupported
+                # if vehicle.model.value in SUPPORTED_VEHICLES:
+                #     vehicles[vin] = vehicle
+                vehicles[vin] = VehicleSnapshot.from_vehicle(
+                    vehicle, self.refresher.updated_at.get(vin)
+                )
+
+        self.vehicles = vehicles
+        return vehicles
+
+    @callback
+    def async_set_restored_data(self, vehicles: dict[str, VehicleSnapshot]) -> None:
+        """Start from the last known data of the cars."""
+        self.vehicles = vehicles
+        self.async_set_updated_data(vehicles)
+
+    @callback
+    def async_save_snapshot(self) -> None:
+        """Persist the last known data of all cars."""
+        vehicles = self.vehicles
+        self.snapshot.async_delay_save(
+            lambda: dump_vehicles(vehicles.values()),
+            SNAPSHOT_SAVE_DELAY,
+        )
+
+    async def async_refresh_domain(
+        self, vin: str, domain: str
+    ) -> VehicleSnapshot | None:
+        """Re-poll one domain of a car and hand the result to its entities."""
+        await self.refresher.async_refresh_domain(vin, domain)
+        data = await self.async_current_vehicle(vin)
+        if data is not None and (
+            vehicle_coordinator := self.vehicle_coordinators.get(vin)
+        ) is not None:
+            vehicle_coordinator.async_set_updated_data(data)
+        return data
+
+    @callback
+    def async_add_vehicle(self, vin: str, data: VehicleSnapshot) -> None:
+        """Set up the coordinator refreshing the data of a single car."""
+        # Cars found after the setup are created outside of its context
+        token = current_entry.set(self.entry)
+        try:
+            vehicle_coordinator = VehicleCoordinator(self, vin, data)
+        finally:
+            current_entry.reset(token)
+        self.vehicle_coordinators[vin] = vehicle_coordinator
+        vehicle_coordinator.async_set_updated_data(data)
+        self.entry.async_on_unload(
+            self.async_add_listener(vehicle_coordinator.async_vehicles_updated)
+        )
+
+    @callback
+    def async_add_new_vehicles(self) -> None:
+        """Set up the coordinators of cars a full update found."""
+        if not self.last_update_success:
+            return
+        for vin, data in self.data.items():
+            if vin not in self.vehicle_coordinators:
+                _LOGGER.info("Car %s was added to the account", vin)
+                self.async_add_vehicle(vin, data)
+
+    @callback
+    def async_command_changed(self, vin: str) -> None:
+        """Show the new outcome of a command on the entities of the car."""
+        if (vehicle_coordinator := self.vehicle_coordinators.get(vin)) is not None:
+            vehicle_coordinator.async_update_listeners()
+
+    async def async_command_accepted(self, vin: str, command: str, args: tuple) -> None:
+        """Follow up on a command the car accepted."""
+        if not self.tracker.async_track(vin, command, args):
+            # Nothing to read back, poll the car faster for a while instead
+            await self.async_command_sent(vin)
+
+    async def async_command_sent(self, vin: str) -> None:
+        """Poll a car at burst cadence for a while after a command was sent to it."""
+        self.last_command[vin] = time.monotonic()
+        if (vehicle_coordinator := self.vehicle_coordinators.get(vin)) is None:
+            # Not part of the account, or found by a full update still in progress
+            return
+        vehicle_coordinator.update_interval = UPDATE_INTERVAL_BURST
+        await vehicle_coordinator.async_request_refresh()
+
+
+class VehicleCoordinator(MeasuredCoordinator[VehicleSnapshot]):
+    """Refresh the stale data of a single car of the account."""
+
+    def __init__(
+        self, account: AccountCoordinator, vin: str, data: VehicleSnapshot
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            account.hass,
+            _LOGGER,
+            name=f"{DOMAIN} {vin}",
+            update_interval=jittered(get_update_interval({vin: data}, None)),
+            metrics=account.client.metrics,
+            phase="vehicle_refresh",
+            trace_attributes={"vin": vin},
+        )
+        self.account = account
+        self.client = account.client
+        self.vin = vin
+        self.breaker = CircuitBreaker()
+
+    async def _async_update_data(self) -> VehicleSnapshot:
+        """Fetch the stale data of the car from Cupra API."""
+        account = self.account
+        vin = self.vin
+        try:
+            if self.breaker.is_open:
+                await asyncio.wait_for(
+                    account.refresher.async_probe(vin), timeout=120.0
+                )
+            requests = await asyncio.wait_for(
+                account.refresher.async_update_vehicle(vin), timeout=120.0
+            )
+        except BudgetExhausted as err:
+            _LOGGER.debug("Skipping update of %s - %s", vin, err)
+            self.update_interval = jittered(
+                self.client.limiter.paced_interval(
+                    UPDATE_INTERVAL_IDLE, len(account.vehicle_coordinators)
+                )
+            )
+            return previous_data(self, err)
+        except TemporaryAuthentificationError as err:
+            return update_failed(
+                self, err, f"Temporary authentication error updating {vin}"
+            )
+        except AuthentificationError as err:
+            raise ConfigEntryAuthFailed(err) from err
+        except asyncio.TimeoutError as err:
+            previous = update_failed(self, err, f"Timeout updating {vin}")
+            if self.client.vehicles_lock.locked():
+                return previous
+            return await account.async_current_vehicle(vin) or previous
+        except Exception as err:
+            return update_failed(
+                self, err, f"Unknown error while updating {vin}", exc_info=True
+            )
+
+        if (data := await account.async_current_vehicle(vin)) is None:
+            if account.refresher.loaded:
+                raise UpdateFailed(f"Car {vin} is no longer part of the account")
+            # Restored from the snapshot, the full update didn't run yet
+            return self.data
+
+        if self.breaker.record_success():
+            _LOGGER.info("Car %s is reachable again", vin)
+        account.async_save_snapshot()
+        # Spread the daily request budget over the rest of the day,
+        # assuming all cars poll like this one
+        self.update_interval = jittered(
+            self.client.limiter.paced_interval(
+                get_update_interval({vin: data}, account.last_command.get(vin)),
+                requests * len(account.vehicle_coordinators),
+            )
+        )
+        return data
+
+    @callback
+    def async_vehicles_updated(self) -> None:
+        """Take over the data of the car from a full update of the account."""
+        account = self.account
+        if not account.last_update_success:
+            return
+        if (vehicle_data := account.data.get(self.vin)) is None:
+            self.async_set_update_error(
+                UpdateFailed(f"Car {self.vin} is no longer part of the account")
+            )
+        elif vehicle_data is not self.data:
+            self.async_set_updated_data(vehicle_data)
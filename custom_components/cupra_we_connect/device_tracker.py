@@ -1,6 +1,7 @@
 """
 Support for Volkswagen WeConnect Platform
 """
+from functools import partial
 import logging
 
 from weconnect_cupra import weconnect_cupra
@@ -12,41 +13,45 @@ from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import slugify
 
-from . import VolkswagenIDBaseEntity, get_object_value
+from . import VolkswagenIDBaseEntity, async_add_supported_entities
+from .accessors import keep_paths
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
+LATITUDE_PATH = ("parking", "parkingPosition", "latitude")
+LONGITUDE_PATH = ("parking", "parkingPosition", "longitude")
+keep_paths((LATITUDE_PATH, LONGITUDE_PATH))
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add sensors for passed config_entry in HA."""
 
     we_connect: weconnect_cupra.WeConnect = hass.data[DOMAIN][config_entry.entry_id]
-    coordinator = hass.data[DOMAIN][config_entry.entry_id + "_coordinator"]
-
-    # Fetch initial data so we have data when entities subscribe
-    await coordinator.async_config_entry_first_refresh()
 
-    entities = []
+    def candidates(vin: str, coordinator: DataUpdateCoordinator):
+        """Return the tracker of a car with the position it needs."""
+        yield (
+            LATITUDE_PATH,
+            partial(VolkswagenIDSensor, we_connect, coordinator, vin),
+        )
 
-    for index, vehicle in enumerate(coordinator.data):
-        entities.append(VolkswagenIDSensor(we_connect, coordinator, index))
-
-    if entities:
-        async_add_entities(entities)
+    async_add_supported_entities(hass, config_entry, async_add_entities, candidates)
 
 
 class VolkswagenIDSensor(VolkswagenIDBaseEntity, TrackerEntity):
     """Representation of a VolkswagenID vehicle sensor."""
 
+    vehicle_domain = "parking"
+
     def __init__(
         self,
         we_connect: weconnect_cupra.WeConnect,
         coordinator: DataUpdateCoordinator,
-        index: int,
+        vin: str,
     ) -> None:
         """Initialize VolkswagenID vehicle sensor."""
-        super().__init__(we_connect, coordinator, index)
+        super().__init__(we_connect, coordinator, vin)
 
         self._coordinator = coordinator
         self._attr_name = f"{self.data.nickname} tracker"
@@ -55,22 +60,12 @@ class VolkswagenIDSensor(VolkswagenIDBaseEntity, TrackerEntity):
     @property
     def latitude(self) -> float:
         """Return latitude value of the device."""
-        try:
-            return get_object_value(
-                self.data.domains["parking"]["parkingPosition"].latitude.value
-            )
-        except KeyError:
-            return None
+        return self.data.get(LATITUDE_PATH)
 
     @property
     def longitude(self) -> float:
         """Return longitude value of the device."""
-        try:
-            return get_object_value(
-                self.data.domains["parking"]["parkingPosition"].longitude.value
-            )
-        except KeyError:
-            return None
+        return self.data.get(LONGITUDE_PATH)
 
     @property
     def source_type(self):
@@ -0,0 +1,56 @@
+"""Diagnostics support for the Cupra We Connect integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the update timings, request counts and errors of a config entry."""
+
+    diagnostics: dict[str, Any] = {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        }
+    }
+    if entry.entry_id not in hass.data.get(DOMAIN, {}):
+        # Shares the connection of another entry of the account
+        diagnostics["polling"] = False
+        return diagnostics
+
+    coordinator = hass.data[DOMAIN][entry.entry_id + "_coordinator"]
+    refresher = hass.data[DOMAIN][entry.entry_id + "_refresher"]
+    diagnostics["polling"] = True
+    diagnostics["metrics"] = hass.data[DOMAIN][entry.entry_id + "_metrics"].as_dict()
+    diagnostics["account_update"] = {
+        "interval": str(coordinator.update_interval),
+        "last_update_success": coordinator.last_update_success,
+    }
+    # Numbered instead of the VINs
+    diagnostics["vehicles"] = [
+        {
+            "interval": str(vehicle_coordinator.update_interval),
+            "last_update_success": vehicle_coordinator.last_update_success,
+            "domains_updated": {
+                domain: updated.isoformat()
+                for domain, updated in sorted(
+                    refresher.updated_at.get(vin, {}).items()
+                )
+            },
+        }
+        for vin, vehicle_coordinator in hass.data[DOMAIN][
+            entry.entry_id + "_vehicle_coordinators"
+        ].items()
+    ]
+    return diagnostics
@@ -0,0 +1,167 @@
+"""Timings and counters of the updates and requests of a Cupra account."""
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+import re
+import time
+from typing import Any, TypeVar
+from urllib.parse import urlsplit
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+
+from .tracing import Span, Tracer
+
+_T = TypeVar("_T")
+
+# VINs and user ids in request paths, replaced to count per endpoint
+_VIN = re.compile(r"/[A-HJ-NPR-Z0-9]{17}(?=/|$)")
+_USER_ID = re.compile(
+    r"/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(?=/|$)"
+)
+
+
+def endpoint_of(url: str) -> str:
+    """Return the endpoint of a request URL, without VIN, user id and query."""
+    parts = urlsplit(url)
+    path = _VIN.sub("/{vin}", _USER_ID.sub("/{user_id}", parts.path))
+    return parts.netloc + path
+
+
+@dataclass
+class PhaseStats:
+    """Durations of one phase of the updates, in seconds."""
+
+    count: int = 0
+    total: float = 0.0
+    last: float = 0.0
+    max: float = 0.0
+
+    def add(self, duration: float) -> None:
+        """Count one run of the phase."""
+        self.count += 1
+        self.total += duration
+        self.last = duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the durations rounded to milliseconds."""
+        return {
+            "count": self.count,
+            "last": round(self.last, 3),
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "max": round(self.max, 3),
+        }
+
+
+class AccountMetrics:
+    """Per-phase timings, requests and bytes per endpoint and error counts.
+
+    Phases are login, token_refresh, account_update (the full update of the
+    library), vehicle_update (the refresh of a single car), fetch_<domain>,
+    parse, request and fan_out (the entities taking over new data), as well
+    as vehicle_refresh, command and confirm, which start the traces.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.since = dt_util.utcnow()
+        self.phases: dict[str, PhaseStats] = {}
+        self.requests: Counter[str] = Counter()
+        self.bytes: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.tracer = Tracer()
+
+    @contextmanager
+    def measure(
+        self, phase: str, root: bool = False, **attributes: Any
+    ) -> Iterator[Span]:
+        """Time a run of a phase, failed runs included, and trace it as span."""
+        start = time.perf_counter()
+        try:
+            with self.tracer.span(phase, root, **attributes) as span:
+                yield span
+        finally:
+            self.phases.setdefault(phase, PhaseStats()).add(
+                time.perf_counter() - start
+            )
+
+    @callback
+    def record_request(self, url: str, size: int, status: int) -> None:
+        """Count a response of the Cupra cloud."""
+        endpoint = endpoint_of(url)
+        self.requests[endpoint] += 1
+        self.bytes[endpoint] += size
+        if status >= 400:
+            self.record_error(f"http_{status}")
+
+    @callback
+    def record_error(self, kind: str) -> None:
+        """Count an error, e.g. timeout, http_500 or domain_charging."""
+        self.errors[kind] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return everything for the diagnostics."""
+        return {
+            "since": self.since.isoformat(),
+            "phases": {
+                phase: stats.as_dict() for phase, stats in sorted(self.phases.items())
+            },
+            "requests": {
+                endpoint: {"count": count, "bytes": self.bytes[endpoint]}
+                for endpoint, count in sorted(self.requests.items())
+            },
+            "errors": dict(sorted(self.errors.items())),
+        }
+
+
+def track_library_requests(hass: HomeAssistant, session, metrics: AccountMetrics) -> None:
+    """Count the requests the library sends with its requests session.
+
+    The hook runs in the worker thread, the counters are updated in the loop.
+    """
+
+    def _count_response(response, *args, **kwargs) -> None:
+        size = 0 if kwargs.get("stream") else len(response.content or b"")
+        hass.loop.call_soon_threadsafe(
+            metrics.record_request, response.url, size, response.status_code
+        )
+
+    session.hooks["response"].append(_count_response)
+
+
+class MeasuredCoordinator(DataUpdateCoordinator[_T]):
+    """Coordinator tracing its refreshes and timing its entities' updates."""
+
+    def __init__(
+        self,
+        *args: Any,
+        metrics: AccountMetrics,
+        phase: str,
+        trace_attributes: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics
+        self._phase = phase
+        self._trace_attributes = trace_attributes or {}
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh the data, traced from the request to the state writes."""
+        with self.metrics.measure(
+            self._phase, root=True, **self._trace_attributes
+        ) as span:
+            await super()._async_refresh(*args, **kwargs)
+            if not self.last_update_success:
+                span.fail(str(self.last_exception))
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners, timed as fan_out."""
+        with self.metrics.measure("fan_out"):
+            super().async_update_listeners()
@@ -1,6 +1,8 @@
 """Entity representing a Volkswagen number control."""
 from __future__ import annotations
 
+from functools import partial
+
 from weconnect_cupra import weconnect_cupra
 
 from homeassistant.components.number import NumberEntity
@@ -9,44 +11,56 @@ from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from . import (
     VolkswagenIDBaseEntity,
-    get_object_value,
+    async_add_supported_entities,
+    async_send_command,
     set_climatisation,
     set_target_soc,
 )
+from .accessors import keep_paths
 from .const import DOMAIN
 
 from homeassistant.const import UnitOfTemperature
 
+TARGET_SOC_PATH = ("charging", "chargingSettings", "targetSOC_pct")
+TARGET_TEMPERATURE_PATH = (
+    "climatisation",
+    "climatisationSettings",
+    "targetTemperature_C",
+)
+keep_paths((TARGET_SOC_PATH, TARGET_TEMPERATURE_PATH))
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add buttons for passed config_entry in HA."""
     we_connect: weconnect_cupra.WeConnect = hass.data[DOMAIN][config_entry.entry_id]
-    coordinator = hass.data[DOMAIN][config_entry.entry_id + "_coordinator"]
 
-    # Fetch initial data so we have data when entities subscribe
-    await coordinator.async_config_entry_first_refresh()
-
-    entities = []
+    def candidates(vin: str, coordinator: DataUpdateCoordinator):
+        """Return the numbers of a car with the value each of them needs."""
+        yield (
+            TARGET_SOC_PATH,
+            partial(TargetSoCNumber, we_connect, coordinator, vin),
+        )
+        yield (
+            TARGET_TEMPERATURE_PATH,
+            partial(TargetClimateNumber, we_connect, coordinator, vin),
+        )
 
-    for index, vehicle in enumerate(coordinator.data):
-        entities.append(TargetSoCNumber(we_connect, coordinator, index))
-        entities.append(TargetClimateNumber(we_connect, coordinator, index))
-    if entities:
-        async_add_entities(entities)
+    async_add_supported_entities(hass, config_entry, async_add_entities, candidates)
 
 
 class TargetSoCNumber(VolkswagenIDBaseEntity, NumberEntity):
     """Representation of a Target SoC entity."""
 
     _attr_entity_category = EntityCategory.CONFIG
+    vehicle_domain = "charging"
 
     def __init__(
         self,
         we_connect: weconnect_cupra.WeConnect,
         coordinator: DataUpdateCoordinator,
-        index: int,
+        vin: str,
     ) -> None:
         """Initialize VolkswagenID vehicle sensor."""
-        super().__init__(we_connect, coordinator, index)
+        super().__init__(we_connect, coordinator, vin)
 
         self._coordinator = coordinator
         self._attr_name = f"{self.data.nickname} Target State Of Charge"
@@ -59,19 +73,18 @@ class TargetSoCNumber(VolkswagenIDBaseEntity, NumberEntity):
     @property
     def native_value(self) -> float | None:
         """Return the value reported by the number."""
-        return int(
-            get_object_value(
-                self.data.domains["charging"]["chargingSettings"].targetSOC_pct.value
-            )
-        )
+        target_soc = self.data.get(TARGET_SOC_PATH)
+        return None if target_soc is None else int(target_soc)
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
         if value > 10:
-            await self.hass.async_add_executor_job(
+            await async_send_command(
+                self.hass,
+                self.coordinator.config_entry.entry_id,
+                self.vin,
+                "target_soc",
                 set_target_soc,
-                self.data.vin.value,
-                self._we_connect,
                 value,
             )
 
@@ -80,15 +93,16 @@ class TargetClimateNumber(VolkswagenIDBaseEntity, NumberEntity):
     """Representation of a Target Climate entity."""
 
     _attr_entity_category = EntityCategory.CONFIG
+    vehicle_domain = "climatisation"
 
     def __init__(
         self,
         we_connect: weconnect_cupra.WeConnect,
         coordinator: DataUpdateCoordinator,
-        index: int,
+        vin: str,
     ) -> None:
         """Initialize VolkswagenID vehicle sensor."""
-        super().__init__(we_connect, coordinator, index)
+        super().__init__(we_connect, coordinator, vin)
 
         self._coordinator = coordinator
         self._attr_name = f"{self.data.nickname} Target Climate Temperature"
@@ -102,16 +116,20 @@ class TargetClimateNumber(VolkswagenIDBaseEntity, NumberEntity):
     @property
     def native_value(self) -> float | None:
         """Return the value reported by the number."""
-        targetTemp = self.data.domains["climatisation"][
-            "climatisationSettings"
-        ].targetTemperature_C.value
+        targetTemp = self.data.get(TARGET_TEMPERATURE_PATH)
 
-        return float(targetTemp)
+        return None if targetTemp is None else float(targetTemp)
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
         if value > 10:
             self._attr_value = value
-            await self.hass.async_add_executor_job(
-                set_climatisation, self.data.vin.value, self._we_connect, "none", value
+            await async_send_command(
+                self.hass,
+                self.coordinator.config_entry.entry_id,
+                self.vin,
+                "target_temperature",
+                set_climatisation,
+                "none",
+                value,
             )
@@ -0,0 +1,176 @@
+"""Request rate limit and daily request budget of a Cupra account."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+import logging
+import time
+
+from weconnect_cupra.errors import RetrievalError
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    COMMAND_BUDGET_RESERVE,
+    DAILY_REQUEST_BUDGET,
+    REQUEST_BURST,
+    REQUESTS_PER_MINUTE,
+    RETRY_AFTER_DEFAULT,
+)
+from .storage import entry_store
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 60
+
+# Lower values are served first
+PRIORITY_COMMAND = 0
+PRIORITY_CONFIRM = 1
+PRIORITY_POLL = 2
+
+
+class BudgetExhausted(RetrievalError):
+    """The daily request budget doesn't allow background requests anymore."""
+
+
+def budget_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the daily request budget of a config entry."""
+    return entry_store(hass, entry_id, "budget", STORAGE_VERSION)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the seconds of a Retry-After header, given as seconds or HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - dt_util.utcnow()).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """Token bucket with priorities plus a daily request budget.
+
+    A full update costs several requests, the library sends them at once. It
+    empties the bucket but isn't booked as debt, the following requests only
+    wait for the next token. Background polls stop before the budget is used
+    up, the rest is reserved for commands.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        store: Store | None = None,
+        requests_per_minute: float = REQUESTS_PER_MINUTE,
+        daily_budget: int = DAILY_REQUEST_BUDGET,
+    ) -> None:
+        """Initialize the limiter."""
+        self._hass = hass
+        self._store = store
+        self._rate = requests_per_minute / 60
+        self._daily_budget = daily_budget
+        self._tokens = float(REQUEST_BURST)
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting: Counter[int] = Counter()
+        self._day = dt_util.now().date().isoformat()
+        self.used_today = 0
+
+    async def async_load(self) -> None:
+        """Restore the requests already used today."""
+        if self._store is None or not (stored := await self._store.async_load()):
+            return
+        if stored.get("day") == self._day:
+            self.used_today = stored.get("used", 0)
+
+    def _roll_day(self) -> None:
+        """Start a new budget at midnight."""
+        if (day := dt_util.now().date().isoformat()) != self._day:
+            self._day = day
+            self.used_today = 0
+
+    def _budget(self, priority: int) -> int:
+        """Return the number of requests a priority may use per day."""
+        if priority == PRIORITY_COMMAND:
+            return self._daily_budget
+        return int(self._daily_budget * (1 - COMMAND_BUDGET_RESERVE))
+
+    def _check_budget(self, priority: int, cost: int) -> None:
+        """Fail if the requests would exceed the budget of the priority today."""
+        self._roll_day()
+        if self.used_today + cost > self._budget(priority):
+            raise BudgetExhausted(
+                f"Daily budget of {self._daily_budget} requests is used up"
+            )
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens accumulated since the last refill."""
+        self._tokens = min(
+            float(REQUEST_BURST), self._tokens + (now - self._refilled) * self._rate
+        )
+        self._refilled = now
+
+    async def async_acquire(self, priority: int = PRIORITY_POLL, cost: int = 1) -> None:
+        """Wait until a request of the priority may be sent."""
+
+        # Fail fast instead of waiting for a token that can't be used
+        self._check_budget(priority, cost)
+        self._waiting[priority] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if (delay := self._blocked_until - now) <= 0:
+                    if any(self._waiting[p] for p in range(priority)):
+                        # Let the more important requests go first
+                        delay = 1 / self._rate
+                    elif self._tokens >= 1:
+                        break
+                    else:
+                        delay = (1 - self._tokens) / self._rate
+                await asyncio.sleep(delay)
+        finally:
+            self._waiting[priority] -= 1
+
+        # Requests waiting together may have used up the budget meanwhile
+        self._check_budget(priority, cost)
+        # Counted in full against the budget, but never below an empty bucket
+        self._tokens = max(self._tokens - cost, 0.0)
+        self.used_today += cost
+        if self._store is not None:
+            self._store.async_delay_save(
+                lambda: {"day": self._day, "used": self.used_today},
+                STORAGE_SAVE_DELAY,
+            )
+
+    def retry_after(self, seconds: float | None) -> None:
+        """Hold back all requests after the server asked to slow down."""
+        if seconds is None:
+            seconds = RETRY_AFTER_DEFAULT.total_seconds()
+        _LOGGER.warning("Cupra API asks to slow down, pausing for %.0f s", seconds)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    def paced_interval(self, interval: timedelta, requests_per_poll: int) -> timedelta:
+        """Stretch a poll interval so the budget left lasts until midnight."""
+
+        self._roll_day()
+        left = self._budget(PRIORITY_POLL) - self.used_today
+        now = dt_util.now()
+        midnight = dt_util.start_of_local_day(now + timedelta(days=1))
+        if requests_per_poll <= 0:
+            return interval
+        if left <= 0:
+            return max(interval, midnight - now)
+        # Polls that still fit today -> at least this long between them
+        return max(interval, (midnight - now) / (left / requests_per_poll))
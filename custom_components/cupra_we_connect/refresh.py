@@ -0,0 +1,360 @@
+"""Selective per-domain refresh of the vehicle status."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import logging
+import time
+from typing import Any
+
+import aiohttp
+
+from weconnect_cupra import weconnect_cupra
+from weconnect_cupra.api.cupra.elements.access_status import AccessStatus
+from weconnect_cupra.api.cupra.elements.battery_status import BatteryStatus
+from weconnect_cupra.api.cupra.elements.charging_settings import ChargingSettings
+from weconnect_cupra.api.cupra.elements.charging_status import ChargingStatus
+from weconnect_cupra.api.cupra.elements.climatization_settings import (
+    ClimatizationSettings,
+)
+from weconnect_cupra.api.cupra.elements.climatization_status import (
+    ClimatizationStatus,
+)
+from weconnect_cupra.api.cupra.elements.connection_status import ConnectionStatus
+from weconnect_cupra.api.cupra.elements.odometer_measurement import (
+    OdometerMeasurement,
+)
+from weconnect_cupra.api.cupra.elements.parking_position import ParkingPosition
+from weconnect_cupra.elements.plug_status import PlugStatus
+from weconnect_cupra.elements.window_heating_status import WindowHeatingStatus
+from weconnect_cupra.errors import RetrievalError
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .client import AsyncCupraClient
+from .const import DEFAULT_MAX_CONCURRENT_REQUESTS
+from .ratelimit import PRIORITY_CONFIRM, PRIORITY_POLL
+
+_LOGGER = logging.getLogger(__name__)
+
+BASE_URL = "https://ola.prod.code.seat.cloud.vwgroup.com"
+
+# Errors of a single domain refresh, the previous data of the domain is kept
+DOMAIN_REFRESH_ERRORS = (
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+    KeyError,
+    TypeError,
+    RetrievalError,
+)
+
+
+@dataclass(frozen=True)
+class VehicleDomain:
+    """Describes how a vehicle domain is fetched from the Cupra API."""
+
+    name: str
+    max_age: timedelta
+    # Endpoint name -> path below BASE_URL
+    endpoints: dict[str, str] = field(default_factory=dict)
+    # Status key -> (library element, properties from the endpoint responses)
+    statuses: dict[str, tuple[type, Callable[[dict[str, Any]], Any]]] = field(
+        default_factory=dict
+    )
+    # Only fetched if the vehicle reports this capability as usable
+    capability: str | None = None
+    # Timeout of every request of the domain, a slow domain doesn't hold up the others
+    timeout: timedelta = timedelta(seconds=10)
+
+
+VEHICLE_DOMAINS: tuple[VehicleDomain, ...] = (
+    VehicleDomain(
+        name="charging",
+        max_age=timedelta(0),
+        endpoints={
+            "settings": "/vehicles/{vin}/charging/settings",
+            "status": "/vehicles/{vin}/charging/status",
+        },
+        statuses={
+            "chargingSettings": (ChargingSettings, lambda r: r["settings"]["settings"]),
+            "chargingStatus": (ChargingStatus, lambda r: r["status"]["status"]["charging"]),
+            "batteryStatus": (BatteryStatus, lambda r: r["status"]["status"]["battery"]),
+            "plugStatus": (PlugStatus, lambda r: r["status"]["status"]["plug"]),
+        },
+    ),
+    VehicleDomain(
+        name="climatisation",
+        max_age=timedelta(0),
+        endpoints={
+            "status": "/v1/vehicles/{vin}/climatisation/status",
+            "settings": "/v2/vehicles/{vin}/climatisation/settings",
+        },
+        statuses={
+            "climatisationStatus": (
+                ClimatizationStatus,
+                lambda r: r["status"]["climatisationStatus"],
+            ),
+            "windowHeatingStatus": (
+                WindowHeatingStatus,
+                lambda r: r["status"]["windowHeatingStatus"],
+            ),
+            "climatisationSettings": (ClimatizationSettings, lambda r: r["settings"]),
+        },
+    ),
+    VehicleDomain(
+        name="status",
+        max_age=timedelta(0),
+        endpoints={"connection": "/vehicles/{vin}/connection"},
+        statuses={
+            "connectionStatus": (
+                ConnectionStatus,
+                lambda r: r["connection"]["connection"],
+            ),
+        },
+    ),
+    VehicleDomain(
+        name="access",
+        max_age=timedelta(minutes=10),
+        endpoints={"status": "/v2/vehicles/{vin}/status"},
+        statuses={"accessStatus": (AccessStatus, lambda r: r["status"])},
+        capability="state",
+        timeout=timedelta(seconds=5),
+    ),
+    VehicleDomain(
+        name="parking",
+        max_age=timedelta(minutes=15),
+        endpoints={"position": "/v1/vehicles/{vin}/parkingposition"},
+        statuses={"parkingPosition": (ParkingPosition, lambda r: r["position"])},
+        capability="parkingPosition",
+        timeout=timedelta(seconds=5),
+    ),
+    VehicleDomain(
+        name="measurements",
+        max_age=timedelta(hours=1),
+        endpoints={"mileage": "/v1/vehicles/{vin}/mileage"},
+        statuses={"odometerStatus": (OdometerMeasurement, lambda r: r["mileage"])},
+        capability="state",
+        timeout=timedelta(seconds=5),
+    ),
+)
+
+# Domains the poll scheduler looks at, these are refreshed even without entities
+SCHEDULER_DOMAINS = ("charging", "climatisation", "status", "access", "parking")
+
+
+def is_capable(vehicle, capability: str | None) -> bool:
+    """Return true if the vehicle can serve a capability (same rule as the library)."""
+    if capability is None:
+        return True
+    return (
+        capability in vehicle.capabilities
+        and not vehicle.capabilities[capability].status.value
+    )
+
+
+def merge_domain(vehicle, domain: VehicleDomain, responses: dict[str, Any]) -> None:
+    """Merge the fetched endpoint responses of a domain into the vehicle object."""
+
+    for status, (klass, properties) in domain.statuses.items():
+        vehicle.assign_properties_to_domain(
+            klass=klass,
+            properties=properties(responses),
+            domain_value=domain.name,
+            settings_key=status,
+        )
+
+
+class DomainRefresher:
+    """Track the age of every vehicle domain and refresh only the stale ones."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        we_connect: weconnect_cupra.WeConnect,
+        client: AsyncCupraClient,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        update_slots: asyncio.Semaphore | None = None,
+    ) -> None:
+        """Initialize the refresher."""
+        self._hass = hass
+        self._we_connect = we_connect
+        self._client = client
+        # Full updates of all accounts running at the same time
+        self._update_slots = update_slots or asyncio.Semaphore(1)
+        # Requests of all cars and domains in flight at the same time
+        self._requests = asyncio.Semaphore(max_concurrent)
+        self._vehicles_updated: float | None = None
+        self._update: asyncio.Task | None = None
+        self._domains_updated: dict[str, dict[str, float]] = {}
+        # Wall clock time of the last successful refresh per VIN and domain
+        self.updated_at: dict[str, dict[str, datetime]] = {}
+        # Number of enabled entities per domain
+        self.wanted: Counter[str] = Counter()
+
+    def is_wanted(self, domain: VehicleDomain) -> bool:
+        """Return true if anything is interested in the domain."""
+        return domain.name in SCHEDULER_DOMAINS or self.wanted[domain.name] > 0
+
+    def stale_domains(self, vehicle, now: float) -> list[VehicleDomain]:
+        """Return the wanted domains of a vehicle that exceeded their max age."""
+        updated = self._domains_updated.get(vehicle.vin.value, {})
+        return [
+            domain
+            for domain in VEHICLE_DOMAINS
+            if self.is_wanted(domain)
+            and is_capable(vehicle, domain.capability)
+            and (
+                domain.name not in updated
+                or now - updated[domain.name] >= domain.max_age.total_seconds()
+            )
+        ]
+
+    async def _async_get(self, url: str, priority: int, timeout: float) -> Any:
+        """Fetch an endpoint once one of the concurrent request slots is free."""
+        async with self._requests:
+            return await self._client.async_get(url, priority, timeout=timeout)
+
+    async def _async_refresh_domain(
+        self, vehicle, domain: VehicleDomain, priority: int = PRIORITY_POLL
+    ) -> None:
+        """Fetch one domain of a vehicle and merge it into the vehicle object."""
+        vin = vehicle.vin.value
+        metrics = self._client.metrics
+        with metrics.measure(f"fetch_{domain.name}", vin=vin, domain=domain.name):
+            results = await asyncio.gather(
+                *(
+                    self._async_get(
+                        BASE_URL + path.format(vin=vin),
+                        priority,
+                        domain.timeout.total_seconds(),
+                    )
+                    for path in domain.endpoints.values()
+                )
+            )
+        async with self._client.vehicles_lock:
+            with metrics.measure("parse", vin=vin, domain=domain.name):
+                merge_domain(vehicle, domain, dict(zip(domain.endpoints, results)))
+
+    def _mark_updated(self, vin: str, name: str, now: float) -> None:
+        """Remember when a domain of a vehicle was refreshed."""
+        self._domains_updated.setdefault(vin, {})[name] = now
+        self.updated_at.setdefault(vin, {})[name] = dt_util.utcnow()
+
+    def full_update_cost(self) -> int:
+        """Return the number of requests of a full update by the library."""
+        endpoints = sum(len(domain.endpoints) for domain in VEHICLE_DOMAINS)
+        # Vehicle list, then the capabilities and every domain of every car
+        return 1 + max(len(self._we_connect.vehicles), 1) * (1 + endpoints)
+
+    async def async_refresh_domain(self, vin: str, name: str) -> None:
+        """Refresh a single domain of a vehicle right away."""
+        if self._update is not None and not self._update.done():
+            # Don't touch the cars while the full update replaces them
+            await asyncio.shield(self._update)
+        vehicle = self._we_connect.vehicles[vin]
+        domain = next(domain for domain in VEHICLE_DOMAINS if domain.name == name)
+        await self._async_refresh_domain(vehicle, domain, PRIORITY_CONFIRM)
+        self._mark_updated(vin, name, time.monotonic())
+        async with self._client.vehicles_lock:
+            vehicle.controls.update()
+
+    @property
+    def loaded(self) -> bool:
+        """Return true once the library fetched the cars of the account."""
+        return self._vehicles_updated is not None
+
+    async def async_probe(self, vin: str | None = None) -> None:
+        """Check with a single small request that the cloud answers again."""
+        if vin is None and (
+            user_id := getattr(self._we_connect.session, "user_id", None)
+        ) is not None:
+            await self._client.async_get(
+                f"{BASE_URL}/v2/users/{user_id}/garage/vehicles"
+            )
+        elif vin := vin or next(iter(self._we_connect.vehicles), None):
+            await self._client.async_get(f"{BASE_URL}/vehicles/{vin}/connection")
+
+    async def async_update(self) -> None:
+        """Fetch the cars of the account and all their domains.
+
+        Concurrent calls join the update in flight. A caller giving up (timeout)
+        doesn't cancel it, so updates never run side by side.
+        """
+        if self._update is None or self._update.done():
+            self._update = self._hass.async_create_task(
+                self._async_update(), name="cupra_we_connect update"
+            )
+        await asyncio.shield(self._update)
+
+    async def _async_update(self) -> None:
+        """Fetch the cars of the account and all their domains."""
+
+        # Also picks up added/removed cars and capabilities, this is only
+        # available as blocking call in the library
+        async with self._update_slots:
+            now = time.monotonic()
+            await self._client.limiter.async_acquire(
+                PRIORITY_POLL, cost=self.full_update_cost()
+            )
+            with self._client.metrics.measure("account_update") as span:
+                async with self._client.vehicles_lock:
+                    await self._client.async_run_job(self._we_connect.update)
+                span.set(vehicles=len(self._we_connect.vehicles))
+        self._vehicles_updated = now
+        self._domains_updated = {}
+        self.updated_at = {}
+        async with self._client.vehicles_lock:
+            for vin, vehicle in self._we_connect.vehicles.items():
+                for domain in VEHICLE_DOMAINS:
+                    if domain.name in vehicle.domains:
+                        self._mark_updated(vin, domain.name, now)
+
+    async def async_update_vehicle(self, vin: str) -> int:
+        """Refresh the stale domains of a vehicle concurrently.
+
+        Return the number of requests it took.
+        """
+        if self._update is not None and not self._update.done():
+            # The full update in flight refreshes this car as well
+            await asyncio.shield(self._update)
+            return 0
+        if (vehicle := self._we_connect.vehicles.get(vin)) is None:
+            return 0
+
+        now = time.monotonic()
+        domains = self.stale_domains(vehicle, now)
+        with self._client.metrics.measure(
+            "vehicle_update",
+            vin=vin,
+            domains=",".join(domain.name for domain in domains),
+        ):
+            results = await asyncio.gather(
+                *(self._async_refresh_domain(vehicle, domain) for domain in domains),
+                return_exceptions=True,
+            )
+
+        error: Exception | None = None
+        refreshed = 0
+        for domain, result in zip(domains, results):
+            if isinstance(result, DOMAIN_REFRESH_ERRORS):
+                # Keep the previous data of this domain and retry next cycle
+                _LOGGER.debug(
+                    "Failed to refresh %s of %s - %s", domain.name, vin, result
+                )
+                self._client.metrics.record_error(f"domain_{domain.name}")
+                error = result
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                self._mark_updated(vin, domain.name, now)
+                refreshed += 1
+        async with self._client.vehicles_lock:
+            vehicle.controls.update()
+
+        if error is not None and not refreshed:
+            raise error
+        return sum(len(domain.endpoints) for domain in domains)
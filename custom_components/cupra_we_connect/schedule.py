@@ -0,0 +1,33 @@
+"""Spreading of the polls of several accounts and Home Assistant instances."""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import hashlib
+import random
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, MAX_CONCURRENT_ACCOUNT_UPDATES, POLL_JITTER
+
+
+def stable_offset(key: str, period: timedelta) -> timedelta:
+    """Return an offset within the period that is the same for a key on every start.
+
+    Config entry ids are random, so different entries and installations end
+    up at different offsets.
+    """
+    digest = hashlib.sha256(key.encode()).digest()
+    return period * (int.from_bytes(digest[:4], "big") / 2**32)
+
+
+def jittered(interval: timedelta) -> timedelta:
+    """Return the interval varied by the poll jitter, so polls don't stay in step."""
+    return interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+
+def account_update_slots(hass: HomeAssistant) -> asyncio.Semaphore:
+    """Return the semaphore limiting the full account updates running at once."""
+    return hass.data.setdefault(DOMAIN, {}).setdefault(
+        "account_update_slots", asyncio.Semaphore(MAX_CONCURRENT_ACCOUNT_UPDATES)
+    )
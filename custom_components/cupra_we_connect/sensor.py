@@ -3,7 +3,9 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from dataclasses import dataclass
-from typing import cast
+from functools import partial
+from datetime import datetime, timedelta
+from typing import Any
 
 from weconnect_cupra import weconnect_cupra
 
@@ -14,6 +16,7 @@ from homeassistant.components.sensor import (
     SensorDeviceClass,
 )
 from homeassistant.const import (
+    MATCH_ALL,
 #     DEVICE_CLASS_BATTERY,
 #     DEVICE_CLASS_POWER,
 #     DEVICE_CLASS_TEMPERATURE,
@@ -26,24 +29,49 @@ from homeassistant.const import (
 #     TEMP_FAHRENHEIT,
 #     TIME_DAYS,
 #     TIME_MINUTES,
+    UnitOfInformation,
     UnitOfLength,
     UnitOfPower,
     UnitOfTime,
     UnitOfTemperature,
     UnitOfSpeed,
 )
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from . import VolkswagenIDBaseEntity, get_object_value
+from . import VolkswagenIDBaseEntity, async_add_supported_entities
+from .accessors import VehicleSnapshot, keep_paths
+from .commands import CONFIRMED, FAILED, PENDING, CommandTracker
 from .const import DOMAIN
+from .metrics import AccountMetrics
+
+# Poll interval of the account metrics, the other sensors follow their coordinator
+SCAN_INTERVAL = timedelta(minutes=1)
+
+
+def km_to_miles(value) -> int | None:
+    """Convert kilometers to whole miles."""
+    if not value:
+        return value
+    return int(float(value) * 0.62137)
 
 
 @dataclass
 class VolkswagenIdEntityDescription(SensorEntityDescription):
     """Describes Volkswagen ID sensor entity."""
 
-    value: Callable = lambda x, y: x
+    # Path through the vehicle domains, the first step is the domain
+    path: tuple[str, ...] = ()
+    convert: Callable[[Any], StateType] | None = None
+
+    def resolve(self, data: VehicleSnapshot) -> StateType:
+        """Resolve the state of the sensor from a vehicle snapshot."""
+        state = data.get(self.path)
+        if state is not None and self.convert is not None:
+            state = self.convert(state)
+        return state
 
 
 SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
@@ -52,18 +80,14 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         key="climatisationState",
         name="Climatisation State",
         state_class=None,
-        value=lambda data: data["climatisation"][
-            "climatisationStatus"
-        ].climatisationState.value,
+        path=("climatisation", "climatisationStatus", "climatisationState"),
     ),
     VolkswagenIdEntityDescription(
         key="remainingClimatisationTime_min",
         name="Remaining Climatisation Time",
         native_unit_of_measurement=UnitOfTime.MINUTES,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["climatisation"][
-            "climatisationStatus"
-        ].remainingClimatisationTime_min.value,
+        path=("climatisation", "climatisationStatus", "remainingClimatisationTime_min"),
     ),
     VolkswagenIdEntityDescription(
         key="targetTemperature_C",
@@ -71,9 +95,7 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         device_class=SensorDeviceClass.TEMPERATURE,
         native_unit_of_measurement=UnitOfTemperature.CELSIUS,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["climatisation"][
-            "climatisationSettings"
-        ].targetTemperature_C.value,
+        path=("climatisation", "climatisationSettings", "targetTemperature_C"),
     ),
     VolkswagenIdEntityDescription(
         key="targetTemperature_F",
@@ -81,18 +103,14 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         device_class=SensorDeviceClass.TEMPERATURE,
         native_unit_of_measurement=UnitOfTemperature.FAHRENHEIT,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["climatisation"][
-            "climatisationSettings"
-        ].targetTemperature_F.value,
+        path=("climatisation", "climatisationSettings", "targetTemperature_F"),
     ),
     # Not available from Cupra
     # VolkswagenIdEntityDescription(
     #     key="unitInCar",
     #     name="Unit In car",
     #     state_class=None,
-    #     value=lambda data: data["climatisation"][
-    #         "climatisationSettings"
-    #     ].unitInCar.value,
+    #     path=("climatisation", "climatisationSettings", "unitInCar"),
     # ),
     # This is a string, not an number
     VolkswagenIdEntityDescription(
@@ -100,16 +118,14 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         name="Charging State",
         icon="mdi:ev-station",
         state_class=None,
-        value=lambda data: data["charging"]["chargingStatus"].chargingState.value,
+        path=("charging", "chargingStatus", "chargingState"),
     ),
     VolkswagenIdEntityDescription(
         key="remainingChargingTimeToComplete_min",
         name="Remaining Charging Time",
         native_unit_of_measurement=UnitOfTime.MINUTES,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["charging"][
-            "chargingStatus"
-        ].remainingChargingTimeToComplete_min.value,
+        path=("charging", "chargingStatus", "remainingChargingTimeToComplete_min"),
     ),
     # This is a string, not an number
     VolkswagenIdEntityDescription(
@@ -117,7 +133,7 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         name="Charging Mode",
         state_class=None,
         icon="mdi:ev-station",
-        value=lambda data: data["charging"]["chargingStatus"].chargeMode.value,
+        path=("charging", "chargingStatus", "chargeMode"),
     ),
     VolkswagenIdEntityDescription(
         key="chargePower_kW",
@@ -125,37 +141,35 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfPower.KILO_WATT,
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["charging"]["chargingStatus"].chargePower_kW.value,
+        path=("charging", "chargingStatus", "chargePower_kW"),
     ),
     VolkswagenIdEntityDescription(
         key="chargeRate_kmph",
         name="Charge Rate",
         native_unit_of_measurement=UnitOfSpeed.KILOMETERS_PER_HOUR,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["charging"]["chargingStatus"].chargeRate_kmph.value,
+        path=("charging", "chargingStatus", "chargeRate_kmph"),
     ),
     # Not available for Cupra ?
     VolkswagenIdEntityDescription(
         key="chargingSettings",
         name="Charging Settings",
         state_class=None,
-        value=lambda data: data["charging"]["chargingStatus"].chargingSettings.value,
+        path=("charging", "chargingStatus", "chargingSettings"),
     ),
     # This is a string, not an number
     VolkswagenIdEntityDescription(
         key="chargeType",
         name="Charge Type",
         state_class=None,
-        value=lambda data: data["charging"]["chargingStatus"].chargeType.value,
+        path=("charging", "chargingStatus", "chargeType"),
     ),
     # This is a string, not an number
     VolkswagenIdEntityDescription(
         key="maxChargeCurrentAC",
         name="Max Charge Current AC",
         state_class=None,
-        value=lambda data: data["charging"][
-            "chargingSettings"
-        ].maxChargeCurrentAC.value,
+        path=("charging", "chargingSettings", "maxChargeCurrentAC"),
     ),
     VolkswagenIdEntityDescription(
         key="targetSOC_pct",
@@ -163,7 +177,7 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         device_class=SensorDeviceClass.BATTERY,
         native_unit_of_measurement=PERCENTAGE,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["charging"]["chargingSettings"].targetSOC_pct.value,
+        path=("charging", "chargingSettings", "targetSOC_pct"),
     ),
     VolkswagenIdEntityDescription(
         key="currentSOC_pct",
@@ -171,25 +185,22 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
         device_class=SensorDeviceClass.BATTERY,
         native_unit_of_measurement=PERCENTAGE,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["charging"]["batteryStatus"].currentSOC_pct.value,
+        path=("charging", "batteryStatus", "currentSOC_pct"),
     ),
     VolkswagenIdEntityDescription(
         name="Range in Kilometers",
         key="cruisingRangeElectric_km",
         native_unit_of_measurement=UnitOfLength.KILOMETERS,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["charging"][
-            "batteryStatus"
-        ].cruisingRangeElectric_km.value,
+        path=("charging", "batteryStatus", "cruisingRangeElectric_km"),
     ),
     VolkswagenIdEntityDescription(
         name="Range in Miles",
         key="cruisingRangeElectric_mi",
         native_unit_of_measurement=UnitOfLength.MILES,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["charging"][
-            "batteryStatus"
-        ].cruisingRangeElectric_km.value,
+        path=("charging", "batteryStatus", "cruisingRangeElectric_km"),
+        convert=km_to_miles,
     ),
     # Not supported by Cupra
     # VolkswagenIdEntityDescription(
@@ -197,27 +208,76 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
     #     key="inspectionDue",
     #     native_unit_of_measurement=TIME_DAYS,
     #     state_class=SensorStateClass.MEASUREMENT,
-    #     value=lambda data: data["vehicleHealthInspection"][
-    #         "maintenanceStatus"
-    #     ].inspectionDue_days.value if "vehicleHealthInspection" in data else None,
+    #     path=("vehicleHealthInspection", "maintenanceStatus", "inspectionDue_days"),
     # ),
     VolkswagenIdEntityDescription(
         name="Odometer in Kilometers",
         key="odometer_km",
         native_unit_of_measurement=UnitOfLength.KILOMETERS,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["measurements"][
-            "odometerStatus"
-        ].odometer.value,
+        path=("measurements", "odometerStatus", "odometer"),
     ),
     VolkswagenIdEntityDescription(
         name="Odometer in Miles",
         key="odometer_mi",
         native_unit_of_measurement=UnitOfLength.MILES,
         state_class=SensorStateClass.MEASUREMENT,
-        value=lambda data: data["measurements"][
-            "odometerStatus"
-        ].odometer.value,
+        path=("measurements", "odometerStatus", "odometer"),
+        convert=km_to_miles,
+    ),
+)
+keep_paths(sensor.path for sensor in SENSORS)
+
+
+@dataclass
+class CupraMetricEntityDescription(SensorEntityDescription):
+    """Describes a sensor of the update and request metrics of an account."""
+
+    value: Callable[[AccountMetrics], StateType] = lambda metrics: None
+    attributes: Callable[[AccountMetrics], dict[str, Any]] = lambda metrics: {}
+
+
+def _last_duration(metrics: AccountMetrics, phase: str) -> float | None:
+    """Return the duration of the last run of a phase."""
+    if (stats := metrics.phases.get(phase)) is None:
+        return None
+    return round(stats.last, 3)
+
+
+METRIC_SENSORS: tuple[CupraMetricEntityDescription, ...] = (
+    CupraMetricEntityDescription(
+        key="vehicle_update_duration",
+        name="Vehicle Update Duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value=lambda metrics: _last_duration(metrics, "vehicle_update"),
+        attributes=lambda metrics: metrics.as_dict()["phases"],
+    ),
+    CupraMetricEntityDescription(
+        key="requests",
+        name="Requests",
+        icon="mdi:cloud-download",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value=lambda metrics: metrics.requests.total(),
+        attributes=lambda metrics: dict(metrics.requests),
+    ),
+    CupraMetricEntityDescription(
+        key="received",
+        name="Data Received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value=lambda metrics: metrics.bytes.total(),
+        attributes=lambda metrics: dict(metrics.bytes),
+    ),
+    CupraMetricEntityDescription(
+        key="errors",
+        name="Errors",
+        icon="mdi:cloud-alert",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value=lambda metrics: metrics.errors.total(),
+        attributes=lambda metrics: dict(metrics.errors),
     ),
 )
 
@@ -225,18 +285,23 @@ SENSORS: tuple[VolkswagenIdEntityDescription, ...] = (
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add sensors for passed config_entry in HA."""
     we_connect: weconnect_cupra.WeConnect = hass.data[DOMAIN][config_entry.entry_id]
-    coordinator = hass.data[DOMAIN][config_entry.entry_id + "_coordinator"]
 
-    # Fetch initial data so we have data when entities subscribe
-    await coordinator.async_config_entry_first_refresh()
+    def candidates(vin: str, coordinator: DataUpdateCoordinator):
+        """Return the sensors of a car with the value each of them needs."""
+        for sensor in SENSORS:
+            yield sensor.path, partial(
+                VolkswagenIDSensor, sensor, we_connect, coordinator, vin
+            )
+        yield None, partial(VolkswagenIDCommandSensor, we_connect, coordinator, vin)
+        yield None, partial(VolkswagenIDLastUpdateSensor, we_connect, coordinator, vin)
 
-    entities: list[VolkswagenIDSensor] = []
+    async_add_supported_entities(hass, config_entry, async_add_entities, candidates)
 
-    for index, vehicle in enumerate(coordinator.data):
-        for sensor in SENSORS:
-            entities.append(VolkswagenIDSensor(sensor, we_connect, coordinator, index))
-    if entities:
-        async_add_entities(entities)
+    metrics: AccountMetrics = hass.data[DOMAIN][config_entry.entry_id + "_metrics"]
+    async_add_entities(
+        CupraAccountMetricSensor(sensor, metrics, config_entry)
+        for sensor in METRIC_SENSORS
+    )
 
 
 class VolkswagenIDSensor(VolkswagenIDBaseEntity, SensorEntity):
@@ -249,12 +314,13 @@ class VolkswagenIDSensor(VolkswagenIDBaseEntity, SensorEntity):
         sensor: VolkswagenIdEntityDescription,
         we_connect: weconnect_cupra.WeConnect,
         coordinator: DataUpdateCoordinator,
-        index: int,
+        vin: str,
     ) -> None:
         """Initialize VolkswagenID vehicle sensor."""
-        super().__init__(we_connect, coordinator, index)
+        super().__init__(we_connect, coordinator, vin)
 
         self.entity_description = sensor
+        self.vehicle_domain = sensor.path[0]
         self._coordinator = coordinator
         self._attr_name = f"{self.data.nickname} {sensor.name}"
         self._attr_unique_id = f"{self.data.vin}-{sensor.key}"
@@ -264,13 +330,116 @@ class VolkswagenIDSensor(VolkswagenIDBaseEntity, SensorEntity):
     @property
     def native_value(self) -> StateType:
         """Return the state."""
+        return self.entity_description.resolve(self.data)
+
+
+class VolkswagenIDCommandSensor(VolkswagenIDBaseEntity, SensorEntity):
+    """Outcome of the last command sent to a VolkswagenID vehicle."""
+
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = [PENDING, CONFIRMED, FAILED]
+    _attr_icon = "mdi:send-check"
+
+    def __init__(
+        self,
+        we_connect: weconnect_cupra.WeConnect,
+        coordinator: DataUpdateCoordinator,
+        vin: str,
+    ) -> None:
+        """Initialize VolkswagenID command sensor."""
+        super().__init__(we_connect, coordinator, vin)
+
+        self._attr_name = f"{self.data.nickname} Last Command"
+        self._attr_unique_id = f"{self.data.vin}-last_command"
 
-        state = get_object_value(self.entity_description.value(self.data.domains))
+    @property
+    def _tracker(self) -> CommandTracker:
+        """Return the command tracker of the config entry."""
+        return self.hass.data[DOMAIN][
+            self.coordinator.config_entry.entry_id + "_tracker"
+        ]
+
+    @property
+    def native_value(self) -> str | None:
+        """Return pending, confirmed or failed."""
+        if (outcome := self._tracker.latest.get(self.vin)) is None:
+            return None
+        return outcome.state
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the command the state belongs to."""
+        attributes = dict(super().extra_state_attributes or {})
+        if (outcome := self._tracker.latest.get(self.vin)) is not None:
+            attributes["command"] = outcome.command
+        return attributes or None
+
+
+class VolkswagenIDLastUpdateSensor(VolkswagenIDBaseEntity, SensorEntity):
+    """Time the data of a VolkswagenID vehicle was last refreshed, per domain."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self,
+        we_connect: weconnect_cupra.WeConnect,
+        coordinator: DataUpdateCoordinator,
+        vin: str,
+    ) -> None:
+        """Initialize VolkswagenID last update sensor."""
+        super().__init__(we_connect, coordinator, vin)
+
+        self._attr_name = f"{self.data.nickname} Last Update"
+        self._attr_unique_id = f"{self.data.vin}-last_update"
+
+    @property
+    def native_value(self) -> datetime | None:
+        """Return the time of the most recent domain refresh."""
+        return max(self.data.updated.values(), default=None)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the refresh time of every domain."""
+        attributes = dict(super().extra_state_attributes or {})
+        for domain, updated in sorted(self.data.updated.items()):
+            attributes[f"{domain}_updated"] = updated.isoformat()
+        return attributes or None
 
-        if self.entity_description.key == "cruisingRangeElectric_mi":
-            state = int(float(state) * 0.62137)
 
-        if state and self.entity_description.key == "odometer_mi":
-            state = int(float(state) * 0.62137)
+class CupraAccountMetricSensor(SensorEntity):
+    """Update and request metrics of the account of a config entry."""
 
-        return cast(StateType, state)
+    entity_description: CupraMetricEntityDescription
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
+    # Per endpoint and per error, too many to keep in the history
+    _unrecorded_attributes = frozenset({MATCH_ALL})
+
+    def __init__(
+        self,
+        sensor: CupraMetricEntityDescription,
+        metrics: AccountMetrics,
+        config_entry,
+    ) -> None:
+        """Initialize the metric sensor."""
+        self.entity_description = sensor
+        self._metrics = metrics
+        self._attr_unique_id = f"{config_entry.entry_id}-{sensor.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, config_entry.entry_id)},
+            manufacturer="Cupra",
+            name=f"Cupra account {config_entry.data['username']}",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the metric."""
+        return self.entity_description.value(self._metrics)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the metric per phase, endpoint or error."""
+        return self.entity_description.attributes(self._metrics) or None
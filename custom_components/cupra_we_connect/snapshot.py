@@ -0,0 +1,107 @@
+"""Persisted snapshot of the last known vehicle data."""
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .accessors import SNAPSHOT_PATHS, Path, VehicleSnapshot
+from .storage import entry_store
+
+# Version 1 stored the library objects as trees, version 2 the flat values
+STORAGE_VERSION = 2
+# Seconds a save waits for more refreshes, pending saves are written at shutdown
+SNAPSHOT_SAVE_DELAY = 600
+
+_PLAIN_TYPES = (str, int, float, bool)
+
+
+class _SnapshotStore(Store):
+    """Store of the vehicle snapshot, migrating the trees of version 1."""
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: Any
+    ) -> Any:
+        """Flatten the trees of version 1 into the values of the snapshots."""
+        if old_major_version > 1:
+            return old_data
+        return [
+            {
+                "vin": vehicle["vin"],
+                "nickname": vehicle["nickname"],
+                "model": vehicle["model"],
+                "values": [
+                    [list(path), value]
+                    for path, value in _walk_tree(vehicle["domains"], ())
+                ],
+            }
+            for vehicle in old_data
+        ]
+
+
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the vehicle snapshot of a config entry."""
+    return entry_store(hass, entry_id, "snapshot", STORAGE_VERSION, _SnapshotStore)
+
+
+def _walk_tree(node: list | None, path: Path) -> Iterator[tuple[Path, Any]]:
+    """Yield the values of a tree dumped by version 1."""
+    if node is None:
+        return
+    kind, content = node
+    if kind == "attribute":
+        if content is not None:
+            yield path, content
+        return
+    for name, child in content.items():
+        yield from _walk_tree(child, (*path, name))
+
+
+def _dump_value(value) -> Any:
+    """Return a JSON value for a snapshot value, None if it can't be stored."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, _PLAIN_TYPES):
+        return value
+    return None
+
+
+def dump_vehicles(vehicles: Iterable[VehicleSnapshot]) -> list[dict[str, Any]]:
+    """Dump the vehicle snapshots into JSON serializable data."""
+    return [
+        {
+            "vin": data.vin,
+            "nickname": data.nickname,
+            "model": data.model,
+            "values": [
+                [list(path), dumped]
+                for path, value in data.values.items()
+                if (dumped := _dump_value(value)) is not None
+            ],
+        }
+        for data in vehicles
+    ]
+
+
+def load_vehicles(snapshot: list[dict[str, Any]]) -> dict[str, VehicleSnapshot]:
+    """Restore the vehicle snapshots, keyed by VIN.
+
+    Values no longer read by the integration are dropped.
+    """
+    return {
+        vehicle["vin"]: VehicleSnapshot(
+            vehicle["vin"],
+            vehicle["nickname"],
+            vehicle["model"],
+            {
+                tuple(path): value
+                for path, value in vehicle["values"]
+                if tuple(path) in SNAPSHOT_PATHS
+            },
+            restored=True,
+        )
+        for vehicle in snapshot
+    }
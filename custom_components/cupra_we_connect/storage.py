@@ -0,0 +1,34 @@
+"""Stores persisting the state of the config entries."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+
+def entry_store(
+    hass: HomeAssistant,
+    entry_id: str,
+    name: str,
+    version: int,
+    store_class: type[Store] = Store,
+) -> Store:
+    """Return a store of a config entry, the same instance on every call.
+
+    Delayed saves are pending on the instance until they are written, a
+    reload has to load through it to see them and a removal has to drop them.
+    """
+    stores: dict[str, Store] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        "stores", {}
+    )
+    key = f"{DOMAIN}.{entry_id}.{name}"
+    if (store := stores.get(key)) is None:
+        store = stores[key] = store_class(hass, version, key)
+    return store
+
+
+async def async_remove_store(hass: HomeAssistant, store: Store) -> None:
+    """Delete a store of a removed config entry with its pending save."""
+    await store.async_remove()
+    hass.data.get(DOMAIN, {}).get("stores", {}).pop(store.key, None)
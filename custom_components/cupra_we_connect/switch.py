@@ -1,42 +1,45 @@
+from functools import partial
 import logging
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
-from . import set_climatisation, start_stop_charging, get_object_value,  set_ac_charging_speed
+from .accessors import keep_paths
+from .const import CHARGING_ACTIVE_STATES, CLIMATISATION_INACTIVE_STATES, DOMAIN
+from . import (
+    ChangeAwareEntity,
+    async_add_supported_entities,
+    async_send_command,
+    set_ac_charging_speed,
+    set_climatisation,
+    start_stop_charging,
+)
 from weconnect_cupra import weconnect_cupra
-from weconnect_cupra.elements.control_operation import ControlOperation
 
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     we_connect: weconnect_cupra.WeConnect = hass.data[DOMAIN][config_entry.entry_id]
-    coordinator = hass.data[DOMAIN][config_entry.entry_id + "_coordinator"]
-    vehicles = hass.data[DOMAIN][config_entry.entry_id + "_vehicles"]  # Liste!
 
-    entities = []
-    for idx, vehicle in enumerate(vehicles):
-        entities.append(CupraClimateSwitch(we_connect, coordinator, idx, vehicle))
-        entities.append(CupraChargingSwitch(we_connect, coordinator, idx, vehicle))
-        entities.append(CupraACChargeSpeedSwitch(we_connect, coordinator, idx, vehicle))
+    def candidates(vin, coordinator):
+        # Nur Schalter anlegen, deren Status das Auto meldet
+        for switch_class in SWITCHES:
+            yield switch_class.path, partial(switch_class, we_connect, coordinator, vin)
 
-
-    async_add_entities(entities, update_before_add=False)
+    async_add_supported_entities(hass, config_entry, async_add_entities, candidates)
     return True
 
 
-class CupraSwitchBase(CoordinatorEntity, SwitchEntity):
+class CupraSwitchBase(ChangeAwareEntity, SwitchEntity):
     _attr_should_poll = False
     _attr_has_entity_name = True
+    # Status im Snapshot, den der Schalter anzeigt
+    path: tuple[str, ...] = ()
 
-    def __init__(self, we_connect: weconnect_cupra.WeConnect, coordinator, index: int, vehicle):
+    def __init__(self, we_connect: weconnect_cupra.WeConnect, coordinator, vin: str):
         super().__init__(coordinator)
         self.we_connect = we_connect
-        self.index = index
-        self._vehicle = vehicle
+        vehicle = coordinator.data
 
-        vin = getattr(vehicle.vin, "value", str(vehicle.vin))
         nickname = getattr(vehicle, "nickname", vin)
         model = getattr(vehicle, "model", None)
 
@@ -50,43 +53,54 @@ class CupraSwitchBase(CoordinatorEntity, SwitchEntity):
 
     @property
     def data(self):
-        # Vehicle-Objekt aus dem Coordinator nach Index
-        return self.coordinator.data[self.index]
+        # Snapshot des Fahrzeugs aus dem Coordinator, keine Objekte der Lib
+        return self.coordinator.data
+
+    @property
+    def extra_state_attributes(self):
+        # Werte aus dem Snapshot bis zum ersten Live-Update markieren
+        if self.data.restored:
+            return {"stale": True}
+        return None
 
+    def _pending(self, command: str):
+        # Angeforderter Zustand, solange das Auto den Befehl nicht bestätigt hat
+        tracker = self.hass.data[DOMAIN][
+            self.coordinator.config_entry.entry_id + "_tracker"
+        ]
+        return tracker.pending(self._vin, command)
 
 
 class CupraClimateSwitch(CupraSwitchBase):
     """Ein/Aus für Klimatisierung."""
 
-    def __init__(self, we_connect, coordinator, index: int, vehicle):
-        super().__init__(we_connect, coordinator, index, vehicle)
+    path = ("climatisation", "climatisationStatus", "climatisationState")
+
+    def __init__(self, we_connect, coordinator, vin: str):
+        super().__init__(we_connect, coordinator, vin)
         self._attr_name = "Climate"
         self._attr_unique_id = f"{self._vin}-climate_switch"
 
     @property
     def is_on(self) -> bool:
-        v = self.data
-        # Versuche, einen sinnvollen Status zu lesen:
-        # 1) über Domains (falls vorhanden)
-        try:
-            state = get_object_value(
-                v.domains["climatisation"]["climatisationStatus"].climatisationState.value
-            )
-            # Mögliche Werte je nach Lib: "on"/"off", "heating"/"cooling"/"off" etc.
-            return str(state).lower() not in ("off", "aus", "false", "inactive", "stopped", "0", "")
-        except Exception:
-            # 2) Fallback: Control-Zustand, wenn verfügbar (nicht immer lesbar)
-            try:
-                ctrl = v.controls.climatizationControl
-                if ctrl is not None and hasattr(ctrl, "value"):
-                    return ctrl.value == ControlOperation.START
-            except Exception:
-                pass
-        return False
+        if (pending := self._pending("climatisation")) is not None:
+            return pending[0] == "start"
+        state = self.data.get(self.path)
+        if state is None:
+            # Kein Status gemeldet -> False
+            return False
+        # Mögliche Werte je nach Lib: "on"/"off", "heating"/"cooling"/"off" etc.
+        return str(state).lower() not in CLIMATISATION_INACTIVE_STATES
 
     async def async_turn_on(self, **kwargs) -> None:
-        success = await self.hass.async_add_executor_job(
-            set_climatisation, self._vin, self.we_connect, "start", 0
+        success = await async_send_command(
+            self.hass,
+            self.coordinator.config_entry.entry_id,
+            self._vin,
+            "climatisation",
+            set_climatisation,
+            "start",
+            0,
         )
         if success:
             # Optimistisch: sofort auf AN setzen
@@ -96,8 +110,14 @@ class CupraClimateSwitch(CupraSwitchBase):
             _LOGGER.error("Climate START failed for VIN %s", self._vin)
 
     async def async_turn_off(self, **kwargs) -> None:
-        success = await self.hass.async_add_executor_job(
-            set_climatisation, self._vin, self.we_connect, "stop", 0
+        success = await async_send_command(
+            self.hass,
+            self.coordinator.config_entry.entry_id,
+            self._vin,
+            "climatisation",
+            set_climatisation,
+            "stop",
+            0,
         )
         if success:
             self._attr_is_on = False
@@ -108,28 +128,33 @@ class CupraClimateSwitch(CupraSwitchBase):
 class CupraChargingSwitch(CupraSwitchBase):
     """Ein/Aus für Ladevorgang."""
 
-    def __init__(self, we_connect, coordinator, index: int, vehicle):
-        super().__init__(we_connect, coordinator, index, vehicle)
+    path = ("charging", "chargingStatus", "chargingState")
+
+    def __init__(self, we_connect, coordinator, vin: str):
+        super().__init__(we_connect, coordinator, vin)
         self._attr_name = "Charging"
         self._attr_unique_id = f"{self._vin}-charging_switch"
 
     @property
     def is_on(self) -> bool:
-        v = self.data
+        if (pending := self._pending("charging")) is not None:
+            return pending[0] == "start"
         # Lies einen Status, z. B. ob aktuell geladen wird
-        try:
-            status = get_object_value(
-                v.domains["charging"]["chargingStatus"].chargingState.value
-            )
-            # typische Werte: "charging", "ready", "error", "off", ...
-            return str(status).lower() in ("charging", "dc_charging", "ac_charging", "on")
-        except Exception:
+        status = self.data.get(self.path)
+        if status is None:
             # Fallback: kein sicherer Status bekannt -> False
             return False
+        # typische Werte: "charging", "ready", "error", "off", ...
+        return str(status).lower() in CHARGING_ACTIVE_STATES
 
     async def async_turn_on(self, **kwargs) -> None:
-        success = await self.hass.async_add_executor_job(
-            start_stop_charging, self._vin, self.we_connect, "start"
+        success = await async_send_command(
+            self.hass,
+            self.coordinator.config_entry.entry_id,
+            self._vin,
+            "charging",
+            start_stop_charging,
+            "start",
         )
         if success:
             self._attr_is_on = True
@@ -138,8 +163,13 @@ class CupraChargingSwitch(CupraSwitchBase):
             _LOGGER.error("Charging START failed for VIN %s", self._vin)
 
     async def async_turn_off(self, **kwargs) -> None:
-        success = await self.hass.async_add_executor_job(
-            start_stop_charging, self._vin, self.we_connect, "stop"
+        success = await async_send_command(
+            self.hass,
+            self.coordinator.config_entry.entry_id,
+            self._vin,
+            "charging",
+            start_stop_charging,
+            "stop",
         )
         if success:
             self._attr_is_on = False
@@ -150,25 +180,28 @@ class CupraChargingSwitch(CupraSwitchBase):
 class CupraACChargeSpeedSwitch(CupraSwitchBase):
     """Switch: ON = maximum, OFF = reduced"""
 
-    def __init__(self, we_connect, coordinator, index: int, vehicle):
-        super().__init__(we_connect, coordinator, index, vehicle)
+    path = ("charging", "chargingSettings", "maxChargeCurrentAC")
+
+    def __init__(self, we_connect, coordinator, vin: str):
+        super().__init__(we_connect, coordinator, vin)
         self._attr_name = "AC Charge Speed (Maximum)"
         self._attr_unique_id = f"{self._vin}-ac_charge_speed_switch"
 
     @property
     def is_on(self) -> bool:
-        v = self.data
-        try:
-            current = get_object_value(
-                v.domains["charging"]["chargingSettings"].maxChargeCurrentAC
-            )
-            return str(current).lower() == "maximum"
-        except Exception:
-            return False
+        if (pending := self._pending("ac_charge_speed")) is not None:
+            return pending[0] == "maximum"
+        current = self.data.get(self.path)
+        return str(current).lower() == "maximum"
 
     async def async_turn_on(self, **kwargs) -> None:
-        success = await self.hass.async_add_executor_job(
-            set_ac_charging_speed, self._vin, self.we_connect, "maximum"
+        success = await async_send_command(
+            self.hass,
+            self.coordinator.config_entry.entry_id,
+            self._vin,
+            "ac_charge_speed",
+            set_ac_charging_speed,
+            "maximum",
         )
         if success:
             # Optional sofort aktualisieren
@@ -178,11 +211,20 @@ class CupraACChargeSpeedSwitch(CupraSwitchBase):
             _LOGGER.error("Failed to set AC charge speed to maximum for VIN %s", self._vin)
 
     async def async_turn_off(self, **kwargs) -> None:
-        success = await self.hass.async_add_executor_job(
-            set_ac_charging_speed, self._vin, self.we_connect, "reduced"
+        success = await async_send_command(
+            self.hass,
+            self.coordinator.config_entry.entry_id,
+            self._vin,
+            "ac_charge_speed",
+            set_ac_charging_speed,
+            "reduced",
         )
         if success:
             self._attr_is_on = False
             self.async_write_ha_state()
         else:
-            _LOGGER.error("Failed to set AC charge speed to reduced for VIN %s", self._vin)
\ No newline at end of file
+            _LOGGER.error("Failed to set AC charge speed to reduced for VIN %s", self._vin)
+
+
+SWITCHES = (CupraClimateSwitch, CupraChargingSwitch, CupraACChargeSpeedSwitch)
+keep_paths(switch_class.path for switch_class in SWITCHES)
@@ -0,0 +1,181 @@
+"""Traces of nested spans for the refreshes and commands of a Cupra account."""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import secrets
+import time
+from typing import Any
+
+from .const import DOMAIN, TRACE_BUFFER_SIZE
+
+EXPORT_JSONL = "jsonl"
+EXPORT_OTLP = "otlp"
+
+
+class Span:
+    """A timed operation, part of the trace of its root span."""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "duration",
+        "attributes",
+        "error",
+        "spans",
+    )
+
+    def __init__(
+        self, tracer: Tracer, name: str, parent: Span | None, attributes: dict
+    ) -> None:
+        """Start the span."""
+        self.tracer = tracer
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.trace_id = secrets.token_hex(16) if parent is None else parent.trace_id
+        self.parent_id = None if parent is None else parent.span_id
+        # Wall clock start in ns, monotonic duration in ns once ended
+        self.start = time.time_ns()
+        self.duration: int | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        # All spans of the trace, shared with the root
+        self.spans: list[Span] = [self] if parent is None else parent.spans
+        if parent is not None:
+            self.spans.append(self)
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes, e.g. the HTTP status or the outcome."""
+        self.attributes.update(attributes)
+
+    def fail(self, message: str) -> None:
+        """Mark the span as failed."""
+        self.error = message
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the span as JSON line record."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start / 1e9,
+            "duration_ms": None if self.duration is None else self.duration / 1e6,
+            "status": "ok" if self.error is None else "error",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def as_otlp(self) -> dict[str, Any]:
+        """Return the span in the OTLP/JSON encoding."""
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.start + (self.duration or 0)),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            # STATUS_CODE_OK or STATUS_CODE_ERROR
+            "status": {"code": 1}
+            if self.error is None
+            else {"code": 2, "message": self.error},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+# Span open in the current task, children started in gathered tasks inherit it
+_current: ContextVar[Span | None] = ContextVar(f"{DOMAIN}_span", default=None)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    """Return an attribute value in the OTLP/JSON encoding."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Record spans, keeping the last finished traces in a ring buffer."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE) -> None:
+        """Initialize the buffer."""
+        self.traces: deque[list[Span]] = deque(maxlen=size)
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, **attributes: Any) -> Iterator[Span]:
+        """Time an operation as child of the current span, or as a new trace.
+
+        A root span always starts a new trace, e.g. in a background task.
+        """
+        parent = _current.get()
+        if root or parent is None or parent.tracer is not self:
+            parent = None
+        span = Span(self, name, parent, attributes)
+        token = _current.set(span)
+        start = time.perf_counter_ns()
+        try:
+            yield span
+        except BaseException as err:
+            if span.error is None:
+                span.fail(repr(err))
+            raise
+        finally:
+            span.duration = time.perf_counter_ns() - start
+            _current.reset(token)
+            if parent is None:
+                self.traces.append(span.spans)
+
+
+def append_lines(path: str, lines: list[str]) -> None:
+    """Append lines to a file, blocking."""
+    with open(path, "a", encoding="utf-8") as file:
+        file.writelines(f"{line}\n" for line in lines)
+
+
+def export_lines(traces: Iterable[list[Span]], export_format: str) -> list[str]:
+    """Return the traces as JSON lines, one per span or one OTLP request."""
+    spans = [span for trace in traces for span in trace]
+    if export_format == EXPORT_OTLP:
+        return [
+            json.dumps(
+                {
+                    "resourceSpans": [
+                        {
+                            "resource": {
+                                "attributes": [
+                                    {
+                                        "key": "service.name",
+                                        "value": {"stringValue": DOMAIN},
+                                    }
+                                ]
+                            },
+                            "scopeSpans": [
+                                {
+                                    "scope": {"name": DOMAIN},
+                                    "spans": [span.as_otlp() for span in spans],
+                                }
+                            ],
+                        }
+                    ]
+                }
+            )
+        ]
+    return [json.dumps(span.as_dict()) for span in spans]